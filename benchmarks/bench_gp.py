@@ -0,0 +1,130 @@
+"""End-to-end GP benchmarks with fixed seeds.
+
+Every configuration runs in its own process on a synthetic dataset and
+reports per-stage timings, evaluations per second, peak RSS and the final
+MSE, compared with benchmarks/baselines.json:
+
+    python benchmarks/bench_gp.py                   # quick suite
+    python benchmarks/bench_gp.py --suite full      # up to 10M rows and 10 variables
+    python benchmarks/bench_gp.py --update          # record new baselines
+
+The exit status is 1 when a final MSE is worse than its baseline by more
+than the tolerance. Throughput depends on the machine and is only reported.
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from datasets import TARGETS, make_dataset
+
+BASELINES = Path(__file__).resolve().parent / 'baselines.json'
+
+SUITES = {
+    'quick': [(target, rows, None) for target in ('f1', 'f3', 'f4', 'f7') for rows in (1_000, 10_000)],
+    'full': [
+        (target, rows, variables)
+        for target in TARGETS
+        if target != 'f2'  # Not finite anywhere on a sensible input range
+        for rows in (1_000, 100_000, 1_000_000, 10_000_000)
+        for variables in (None, 10)
+    ],
+}
+
+GP_OPTIONS = dict(
+    pop_size=200,
+    generations=20,
+    max_depth=5,
+    crossover_rate=0.4,
+    mutation_rate=0.8,
+    elitism=True,
+    elitism_size=10,
+    verbose=False,
+)
+
+
+def config_name(target: str, rows: int, variables: int | None) -> str:
+    return f'{target}-{rows}' + (f'x{variables}' if variables else '')
+
+def run_config(target: str, rows: int, variables: int | None, seed: int) -> dict:
+    """Run one configuration; meant to be called in a fresh worker process."""
+    from src.gp import genetic_programming
+    from src.instrumentation import Instrumentation, ListSink
+
+    X, y = make_dataset(target, rows, variables, seed)
+    random.seed(seed)
+    np.random.seed(seed)
+    records = ListSink()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        best_individual, best_fitness, _ = genetic_programming(X, y, instrumentation=Instrumentation(records), **GP_OPTIONS)
+    wall_time = time.perf_counter() - start
+
+    stages = {}
+    for record in records.records:
+        for stage, seconds in record['timings'].items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+    evaluations = sum(record.get('evaluations', 0) for record in records.records)
+    nodes = sum(record.get('nodes_evaluated', 0) for record in records.records)
+    return {
+        'mse': best_fitness,
+        'expression': str(best_individual),
+        'generations': len(records.records),
+        'wall_time': wall_time,
+        'stages': stages,
+        'evaluations': evaluations,
+        'evaluations_per_second': evaluations / stages['evaluation'] if stages.get('evaluation') else None,
+        'nodes_per_second': nodes / stages['evaluation'] if stages.get('evaluation') else None,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--suite', choices=SUITES, default='quick')
+    parser.add_argument('--only', default='', help='run only configurations whose name contains this string')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tolerance', type=float, default=0.05, help='allowed relative MSE regression')
+    parser.add_argument('--output', help='write the full results to this JSON file')
+    parser.add_argument('--update', action='store_true', help='store the results as the new baselines')
+    args = parser.parse_args()
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    results = {}
+    regressions = []
+    print(f"{'config':<16} {'mse':>12} {'baseline':>12} {'time s':>8} {'evals/s':>10} {'rss MB':>8}")
+    for target, rows, variables in SUITES[args.suite]:
+        name = config_name(target, rows, variables)
+        if args.only not in name:
+            continue
+        # A fresh process per configuration keeps peak RSS and caches independent
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run_config, target, rows, variables, args.seed).result()
+        results[name] = result
+
+        baseline = baselines.get(name, {}).get('mse')
+        if baseline is not None and result['mse'] > baseline * (1 + args.tolerance) + 1e-12:
+            regressions.append(name)
+        print(f"{name:<16} {result['mse']:>12.6g} {baseline if baseline is not None else float('nan'):>12.6g} "
+              f"{result['wall_time']:>8.2f} {result['evaluations_per_second'] or 0:>10.0f} {result['peak_rss_mb']:>8.1f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.update:
+        baselines.update({name: {'mse': result['mse'], 'evaluations_per_second': result['evaluations_per_second']}
+                          for name, result in results.items()})
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+    if regressions:
+        print(f"MSE regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
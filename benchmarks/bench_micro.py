@@ -0,0 +1,73 @@
+"""Microbenchmarks of the GP building blocks on a fixed random population.
+
+    python benchmarks/bench_micro.py [--pop 500] [--rows 10000] [--output micro.json]
+
+Each operation is timed with timeit and reported as the best time per call
+over several repeats.
+"""
+import argparse
+import json
+import random
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+from datasets import make_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pop', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--max-depth', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the timings to this JSON file')
+    args = parser.parse_args()
+
+    from src import utils
+    from src.utils import initialize_population, simplify_expression
+    from src.crossover import crossover
+    from src.mutations import mutate
+    from src.selection import multi_objective_selection
+    from src.fitness import evaluate_population
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    X, y = make_dataset('f3', args.rows, seed=args.seed)
+    # Simplified up front, so that no benchmark edits the shared trees in place
+    population = [
+        simplify_expression(tree)
+        for tree in initialize_population(args.pop, X.shape[1], args.max_depth, np.random.default_rng(args.seed))
+    ]
+    objectives, _ = evaluate_population(population, X, y)
+    objectives_dict = {ind: (mse, complexity) for ind, mse, complexity in objectives}
+    trees = iter(lambda: random.choice(population), None)
+
+    def simplify_cold():
+        utils._simplify_memo.clear()
+        simplify_expression(next(trees).clone())
+
+    benchmarks = {
+        'Node.evaluate': (lambda: next(trees).evaluate(X), 200),
+        'clone': (lambda: next(trees).clone(), 10_000),
+        'crossover': (lambda: crossover(next(trees), next(trees)), 5_000),
+        'mutate': (lambda: mutate(next(trees), args.max_depth, 1.0, X.shape[1]), 5_000),
+        'multi_objective_selection': (lambda: multi_objective_selection(objectives_dict), 20),
+        'simplify_expression (cold)': (simplify_cold, 2_000),
+        'simplify_expression (memoized)': (lambda: simplify_expression(next(trees)), 20_000),
+    }
+
+    results = {}
+    for name, (function, number) in benchmarks.items():
+        best = min(timeit.repeat(function, number=number, repeat=args.repeat)) / number
+        results[name] = best
+        print(f"{name:<32} {best * 1e6:>12.2f} us")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
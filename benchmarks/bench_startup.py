@@ -0,0 +1,78 @@
+"""Startup-time regression check for the package entry points.
+
+Each entry point is imported in a fresh interpreter, which reports the
+import time and the modules it loaded:
+
+    python benchmarks/bench_startup.py [--repeat 5] [--budget 1.0]
+
+The exit status is 1 when an entry point loads a module it must not (the
+evaluation workers only need the evaluation core, the command line only
+argparse until a command runs), or when its best import time over the
+repeats exceeds the budget in seconds.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Entry point -> (import statement, module prefixes it must not load)
+ENTRY_POINTS = {
+    'evaluation core': ('import src.fitness', ('src.gp', 'src.pool', 'src.utils', 'multiprocessing', 'matplotlib')),
+    'evaluation worker': ('import src.pool', ('src.gp', 'src.variation', 'src.utils', 'concurrent.futures', 'matplotlib')),
+    'search loop': ('import src.gp', ('src.pool', 'src.variation', 'multiprocessing', 'concurrent.futures', 'matplotlib')),
+    'package': ('import src', ('numpy', 'src.')),
+    'cli': ('import src.cli', ('numpy', 'src.gp', 'multiprocessing', 'matplotlib')),
+}
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'time': elapsed, 'modules': sorted(sys.modules)}}))
+'''
+
+
+def probe(statement: str) -> dict:
+    """Run an import statement in a fresh interpreter from the repository root."""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(statement=statement)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output)
+
+def forbidden_modules(modules: list[str], prefixes: tuple[str, ...]) -> list[str]:
+    return [module for module in modules if any(module == prefix or module.startswith(prefix.rstrip('.') + '.') for prefix in prefixes)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0, help='allowed import time of every entry point, in seconds')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    print(f"{'entry point':<20} {'import ms':>10} {'modules':>8}  unexpected")
+    for name, (statement, prefixes) in ENTRY_POINTS.items():
+        runs = [probe(statement) for _ in range(args.repeat)]
+        best = min(run['time'] for run in runs)
+        modules = runs[0]['modules']
+        unexpected = forbidden_modules(modules, prefixes)
+        results[name] = {'import_time': best, 'modules': len(modules), 'unexpected': unexpected}
+        if unexpected or best > args.budget:
+            failures.append(name)
+        print(f"{name:<20} {best * 1000:>10.1f} {len(modules):>8}  {', '.join(unexpected)}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if failures:
+        print(f"Startup regressions: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
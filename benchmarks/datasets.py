@@ -0,0 +1,54 @@
+"""Synthetic symbolic regression datasets built from the target functions of s331445.py."""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# The repository root holds s331445.py and the src package
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import s331445
+
+TARGETS = {f'f{k}': getattr(s331445, f'f{k}') for k in range(1, 9)}
+INPUT_RANGE = (-3.0, 3.0)
+# Targets taking logs, square roots or divisions of raw inputs are sampled on positive inputs
+INPUT_RANGES = {'f7': (0.1, 3.0), 'f8': (0.1, 3.0)}
+MAX_ROUNDS = 100
+
+
+def required_variables(target) -> int:
+    """Smallest number of input variables a target function reads."""
+    for n_variables in range(1, 11):
+        try:
+            with np.errstate(all='ignore'):
+                target(np.ones((n_variables, 1)))
+            return n_variables
+        except IndexError:
+            continue
+    raise ValueError(f"{target.__name__} reads more than 10 variables")
+
+def make_dataset(name: str, n_rows: int, n_variables: int | None = None, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Sample (X, y) for a target, with X of shape (n_rows, n_variables).
+
+    Variables beyond those the target reads are pure distractors. Rows where
+    the target is not finite (log or sqrt of a negative input) are dropped and
+    resampled, so the dataset always has exactly n_rows rows. A target that is
+    almost never finite on its input range raises a ValueError.
+    """
+    target = TARGETS[name]
+    n_variables = max(n_variables or 0, required_variables(target))
+    rng = np.random.default_rng(seed)
+    X_parts, y_parts, n_kept = [], [], 0
+    for _ in range(MAX_ROUNDS):
+        X = rng.uniform(*INPUT_RANGES.get(name, INPUT_RANGE), size=(n_rows, n_variables))
+        with np.errstate(all='ignore'):
+            y = np.broadcast_to(np.asarray(target(X.T), dtype=np.float64), (n_rows,))
+        finite = np.isfinite(y)
+        X_parts.append(X[finite])
+        y_parts.append(y[finite])
+        n_kept += int(finite.sum())
+        if n_kept >= n_rows:
+            return np.concatenate(X_parts)[:n_rows], np.concatenate(y_parts)[:n_rows]
+    raise ValueError(f"{name} is not finite on enough of its input range")
@@ -0,0 +1,36 @@
+"""Genetic programming for symbolic regression.
+
+The names below are imported from their submodule on first access, so that
+importing the evaluation core (src.node, src.compiler, src.fitness) in a
+worker process does not also load the search loop or the process pools.
+"""
+import importlib
+
+_EXPORTS = {
+    'genetic_programming': 'gp',
+    'steady_state_programming': 'gp',
+    'island_model': 'islands',
+    'Node': 'node',
+    'OperatorNode': 'node',
+    'OperandNode': 'node',
+    'FitnessCache': 'fitness',
+    'predict': 'fitness',
+    'ParetoArchive': 'archive',
+    'ChunkedDataset': 'streaming',
+    'Instrumentation': 'instrumentation',
+    'compile_expression': 'export',
+    'write_module': 'export',
+    'load_checkpoint': 'checkpoint',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f'.{module}', __name__), name)
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
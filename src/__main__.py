@@ -0,0 +1,7 @@
+import sys
+
+from .cli import main
+
+# Guarded: process pools using spawn import this module again in their workers
+if __name__ == '__main__':
+    sys.exit(main())
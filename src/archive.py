@@ -0,0 +1,86 @@
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from .node import Node
+from .selection import non_dominated_sort, update_front
+
+
+class ParetoArchive:
+    """Best individual of every complexity seen during a run, indexed by complexity.
+
+    Complexities are small integers kept in a sorted list, and each one maps
+    to the lowest-MSE individual found with that many nodes. The (MSE,
+    complexity) Pareto front of those buckets is maintained incrementally,
+    so checking whether a point is dominated and inserting one both take a
+    binary search. Individuals are cloned when they enter the archive, so
+    later in-place edits of the population do not reach it, and without
+    their cached subtree outputs, so the archive holds no evaluation vectors.
+    """
+
+    def __init__(self):
+        self.complexities = []  # sorted complexities with a bucket
+        self.buckets = {}       # complexity -> (mse, individual)
+        self._front = []        # (complexity, mse, individual), see update_front
+        self._ranks = None      # front rank of every bucket, in complexity order
+
+    def __len__(self):
+        return len(self.complexities)
+
+    def __contains__(self, complexity: int) -> bool:
+        return complexity in self.buckets
+
+    def __iter__(self):
+        """Yield (individual, mse, complexity) for every bucket, by increasing complexity."""
+        for complexity in self.complexities:
+            mse, individual = self.buckets[complexity]
+            yield individual, mse, complexity
+
+    def dominated(self, mse: float, complexity: int) -> bool:
+        """Whether some archived individual, no more complex, is at least as accurate."""
+        i = bisect_left(self._front, complexity + 1, key=lambda member: member[0])
+        return i > 0 and self._front[i - 1][1] <= mse
+
+    def insert(self, individual: Node, mse: float, complexity: int) -> bool:
+        """Keep individual if it is the most accurate of its complexity so far; return whether it was kept."""
+        if not np.isfinite(mse):
+            return False
+        bucket = self.buckets.get(complexity)
+        if bucket is not None and bucket[0] <= mse:
+            return False
+        individual = individual.clone(outputs=False)
+        if bucket is None:
+            insort(self.complexities, complexity)
+        self.buckets[complexity] = (mse, individual)
+        update_front(self._front, complexity, mse, individual)
+        self._ranks = None
+        return True
+
+    def update(self, objectives: list[tuple[Node, float, int]]) -> int:
+        """Insert every (individual, mse, complexity) of an evaluated population, returning how many were kept."""
+        return sum(self.insert(individual, mse, complexity) for individual, mse, complexity in objectives)
+
+    def remove(self, complexity: int) -> tuple[Node, float]:
+        """Remove and return the (individual, mse) of a complexity bucket."""
+        mse, individual = self.buckets.pop(complexity)
+        del self.complexities[bisect_left(self.complexities, complexity)]
+        if any(member[0] == complexity for member in self._front):
+            # The front member is gone: buckets it dominated may now be on the front
+            self._front = []
+            for other in self.complexities:
+                update_front(self._front, other, *self.buckets[other])
+        self._ranks = None
+        return individual, mse
+
+    def front(self, rank: int = 0) -> list[tuple[Node, float, int]]:
+        """The (individual, mse, complexity) of the buckets on the given Pareto front rank, 0 being the best."""
+        if rank == 0:
+            return [(individual, mse, complexity) for complexity, mse, individual in self._front]
+        if self._ranks is None:
+            self._ranks = non_dominated_sort([(self.buckets[c][0], c) for c in self.complexities])
+        return [entry for entry, entry_rank in zip(self, self._ranks) if entry_rank == rank]
+
+    def best(self) -> tuple[Node, float, int]:
+        """The most accurate archived individual, with its MSE and complexity."""
+        complexity, mse, individual = self._front[-1]
+        return individual, mse, complexity
@@ -0,0 +1,132 @@
+import mmap
+import os
+import pickle
+import queue
+import struct
+import threading
+
+import numpy as np
+
+from .node import Node
+from .encoding import encode_population, decode_population
+
+FILE_MAGIC = b'GPCKPT1\n'
+RECORD_MAGIC = b'GPREC01\n'
+# magic, record length, generation, individuals, nodes, best individuals, best nodes, state bytes
+RECORD_HEADER = struct.Struct('<8s7q')
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+def _record(generation, population, mse, complexity, best_individuals, state) -> bytes:
+    """Serialize one checkpoint record; every section is aligned on 8 bytes."""
+    offsets, opcodes, args, values = encode_population(population)
+    best_offsets, best_opcodes, best_args, best_values = encode_population(best_individuals)
+    state_bytes = pickle.dumps(state)
+    sections = [
+        offsets, opcodes, args, values,
+        np.asarray(mse, dtype=np.float64), np.asarray(complexity, dtype=np.int64),
+        best_offsets, best_opcodes, best_args, best_values,
+    ]
+    body = bytearray()
+    for section in sections:
+        data = np.ascontiguousarray(section).tobytes()
+        body += data + bytes(_padding(len(data)))
+    body += state_bytes + bytes(_padding(len(state_bytes)))
+    header = RECORD_HEADER.pack(
+        RECORD_MAGIC, RECORD_HEADER.size + len(body), generation,
+        len(population), len(opcodes), len(best_individuals), len(best_opcodes), len(state_bytes),
+    )
+    return header + bytes(body)
+
+
+class Checkpoint:
+    """One record of a checkpoint file, with arrays viewing the memory-mapped file."""
+
+    def __init__(self, buffer, offset: int):
+        magic, length, generation, n, n_nodes, n_best, n_best_nodes, state_length = RECORD_HEADER.unpack_from(buffer, offset)
+        if magic != RECORD_MAGIC:
+            raise ValueError(f"Corrupted checkpoint record at byte {offset}")
+        self.length = length
+        self.generation = generation
+
+        position = offset + RECORD_HEADER.size
+
+        def take(dtype, count):
+            nonlocal position
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=position)
+            position += array.nbytes + _padding(array.nbytes)
+            return array
+
+        self._population = (take(np.int64, n + 1), take(np.uint8, n_nodes), take(np.int32, n_nodes), take(np.float64, n_nodes))
+        self.mse = take(np.float64, n)
+        self.complexity = take(np.int64, n)
+        self._best = (take(np.int64, n_best + 1), take(np.uint8, n_best_nodes), take(np.int32, n_best_nodes), take(np.float64, n_best_nodes))
+        self.state = pickle.loads(bytes(buffer[position:position + state_length]))
+
+    @property
+    def population(self) -> list[Node]:
+        return decode_population(self._population)
+
+    @property
+    def best_individuals(self) -> list[Node]:
+        return decode_population(self._best)
+
+
+def load_checkpoint(path: str) -> Checkpoint | None:
+    """Memory-map a checkpoint file and return its last complete record, or None if there is none."""
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size <= len(FILE_MAGIC):
+            return None
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(FILE_MAGIC)] != FILE_MAGIC:
+        raise ValueError(f"{path} is not a checkpoint file")
+
+    # Jump from header to header; a truncated trailing record (interrupted write) is ignored
+    offset, last = len(FILE_MAGIC), None
+    while offset + RECORD_HEADER.size <= size:
+        length = RECORD_HEADER.unpack_from(buffer, offset)[1]
+        if offset + length > size:
+            break
+        last = offset
+        offset += length
+    return Checkpoint(buffer, last) if last is not None else None
+
+
+class CheckpointWriter:
+    """Appends checkpoint records to a single binary file from a background thread.
+
+    Populations are encoded on the calling thread, so later in-place edits
+    cannot leak into a record, and the file I/O happens on the writer thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'wb') as file:
+                file.write(FILE_MAGIC)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with open(self.path, 'ab') as file:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                file.write(record)
+                file.flush()
+
+    def write(self, generation: int, population: list[Node], mse, complexity, best_individuals: list[Node], state: dict):
+        """Queue a record holding a population, its fitness, the best individuals so far and extra state."""
+        self._queue.put(_record(generation, population, mse, complexity, best_individuals, state))
+
+    def close(self):
+        """Flush the pending records and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
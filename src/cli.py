@@ -0,0 +1,130 @@
+"""Headless command line entry point:
+
+    python -m src run --data data/problem_4.npz --pop 500
+
+Only argparse is imported up front. NumPy, the search loop, the process
+pools and matplotlib are imported when a command needs them, so that
+--help, and the workers of a spawned process pool re-importing this
+module, start quickly.
+"""
+import argparse
+import sys
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src', description='Symbolic regression by genetic programming.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='evolve an expression for a dataset')
+    run.add_argument('--data', required=True, help=".npz file with x of shape (n_variables, n_samples) and y")
+    run.add_argument('--pop', type=int, default=500, help='population size')
+    run.add_argument('--generations', type=int, default=100)
+    run.add_argument('--max-depth', type=int, default=5)
+    run.add_argument('--crossover-rate', type=float, default=0.4)
+    run.add_argument('--mutation-rate', type=float, default=0.8)
+    run.add_argument('--elitism-size', type=int, default=10)
+    run.add_argument('--max-size', type=int, help='node budget of crossover offspring')
+    run.add_argument('--bloat-control', choices=('tarpeian', 'double_tournament'))
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--n-jobs', type=int, default=1, help='evaluation worker processes, -1 for all cores')
+    run.add_argument('--offspring-jobs', type=int, default=0, help='variation worker processes, 0 to vary in-process')
+    run.add_argument('--output-cache-mb', type=int, default=0, help='memory for cached subtree outputs')
+    run.add_argument('--checkpoint', help='checkpoint file, written every --checkpoint-every generations')
+    run.add_argument('--checkpoint-every', type=int, default=10)
+    run.add_argument('--resume', action='store_true', help='resume from --checkpoint if it exists')
+    run.add_argument('--export', metavar='PATH', help='write the best expression as a Python module')
+    run.add_argument('--plot', action='store_true', help='plot the fit and the fitness history (needs matplotlib)')
+    run.add_argument('--verbose', action='store_true', help='print the per-generation statistics and timings')
+    return parser
+
+def load_data(path: str):
+    """Load a problem file, returning X as (n_samples, n_variables) and y."""
+    import numpy as np
+
+    problem = np.load(path)
+    return np.array(problem['x']).T, np.array(problem['y'])
+
+def plot_results(X, y, y_pred, best_fitness_values):
+    """Plot the data against the predictions, then the best fitness over generations."""
+    from matplotlib import pyplot as plt
+
+    # Visualize the results considering X has a variable number of columns
+    if X.shape[1] == 1:
+        plt.figure(figsize=(10, 6))
+        plt.plot(X[:, 0], y, color='blue', label='Data', alpha=0.6)
+        plt.plot(X[:, 0], y_pred, color='red', label='Best GP Expression')
+        plt.legend()
+        plt.title('Symbolic Regression using Genetic Programming')
+        plt.xlabel('x')
+        plt.ylabel('y')
+        plt.show()
+    else:
+        fig = plt.figure(figsize=(10, 6))
+        ax = fig.add_subplot(111, projection='3d')
+        ax.scatter(X[:, 0], X[:, 1], y, color='blue', label='Data', alpha=0.6)
+        ax.plot_trisurf(X[:, 0], X[:, 1], y_pred, color='red', alpha=0.6)
+        ax.set_xlabel('x_0')
+        ax.set_ylabel('x_1')
+        ax.set_zlabel('y')
+        ax.set_title('Symbolic Regression using Genetic Programming (3D Visualization)')
+        plt.legend()
+        plt.show()
+
+    plt.figure(figsize=(10, 6))
+    plt.plot(best_fitness_values, color='blue', label='Best Fitness')
+    plt.title('Best Fitness over Generations')
+    plt.xlabel('Generation')
+    plt.ylabel('Best Fitness')
+    plt.legend()
+    plt.show()
+
+def run(args) -> int:
+    import importlib.util
+    import random
+    import numpy as np
+    from .gp import genetic_programming
+    from .fitness import predict
+
+    if args.plot and importlib.util.find_spec('matplotlib') is None:
+        print("--plot requires matplotlib", file=sys.stderr)
+        return 1
+
+    np.random.seed(args.seed)
+    random.seed(args.seed)
+    X, y = load_data(args.data)
+
+    best_expr, best_fit, best_fitness_values = genetic_programming(
+        X, y,
+        pop_size=args.pop,
+        generations=args.generations,
+        max_depth=args.max_depth,
+        crossover_rate=args.crossover_rate,
+        mutation_rate=args.mutation_rate,
+        elitism=True,
+        elitism_size=args.elitism_size,
+        checkpoint_file=args.checkpoint,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        offspring_jobs=args.offspring_jobs,
+        n_jobs=args.n_jobs,
+        output_cache_bytes=args.output_cache_mb * 2 ** 20,
+        max_size=args.max_size,
+        bloat_control=args.bloat_control,
+        verbose=args.verbose,
+    )
+
+    print(f"\nBest Expression: {best_expr}")
+    print(f"Best Fitness: {best_fit}")
+
+    if args.export:
+        from .export import write_module
+        write_module(args.export, {'f': best_expr}, header=f"Best Fitness: {best_fit}")
+    if args.plot:
+        plot_results(X, y, predict(best_expr, X), best_fitness_values)
+    return 0
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == 'run':
+        return run(args)
+    return 2
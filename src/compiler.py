@@ -0,0 +1,182 @@
+import numpy as np
+
+from .node import Node, OperatorNode, OperandNode
+
+# Opcodes for leaves, followed by the OperatorNode opcodes shifted by OP_OFFSET
+OP_VAR = 0
+OP_CONST = 1
+OP_OFFSET = 2
+OPCODES = {symbol: opcode + OP_OFFSET for symbol, opcode in OperatorNode.OPCODES.items()}
+BINARY_OPCODES = frozenset(opcode + OP_OFFSET for opcode in OperatorNode.BINARY_OPCODES)
+
+
+def _div(a, b):
+    """In-place protected division, writing 1 wherever the divisor is zero."""
+    zero = b == 0
+    np.divide(a, b, out=a, where=~zero)
+    a[zero] = 1.0
+
+def _clipped(ufunc, low, high):
+    """Build an in-place kernel that clips its input before applying ufunc."""
+    def kernel(a):
+        np.clip(a, low, high, out=a)
+        ufunc(a, out=a)
+    return kernel
+
+# In-place column kernels, mirroring the semantics of OperatorNode.OPERATORS
+_KERNELS = {
+    '+': lambda a, b: np.add(a, b, out=a),
+    '-': lambda a, b: np.subtract(a, b, out=a),
+    '*': lambda a, b: np.multiply(a, b, out=a),
+    '/': _div,
+    'sin': _clipped(np.sin, -1e10, 1e10),
+    'cos': _clipped(np.cos, -1e10, 1e10),
+    'tan': _clipped(np.tan, -1e10, 1e10),
+    'log': _clipped(np.log, 1e-10, None),
+    'exp': _clipped(np.exp, -700, 700),
+    'sqrt': _clipped(np.sqrt, 0, None),
+    'abs': lambda a: np.abs(a, out=a),
+}
+KERNELS = [None] * OP_OFFSET + [_KERNELS[symbol] for symbol in OperatorNode.SYMBOLS]
+
+
+class Program:
+    """A tree lowered to postfix form: opcode and argument arrays plus a constant pool."""
+
+    __slots__ = ('opcodes', 'args', 'constants', 'stack_size')
+
+    def __init__(self, opcodes, args, constants, stack_size):
+        self.opcodes = opcodes
+        self.args = args
+        self.constants = constants
+        self.stack_size = stack_size
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def evaluate(self, X):
+        """Run the program over a (n_samples, n_vars) matrix with the shared stack machine."""
+        return run_program(self, X)
+
+
+def compile_tree(root: Node, constant_nodes: list | None = None) -> Program:
+    """Compile an expression tree into a postfix Program.
+
+    When constant_nodes is given, the OperandNodes behind the constant pool are
+    appended to it in pool order, so tuned constants can be written back.
+    """
+    opcodes, args, constants = [], [], []
+    depth = max_depth = 0
+
+    # Iterative post-order traversal: children are emitted before their operator
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if isinstance(node, OperandNode):
+            if node.index >= 0:
+                opcodes.append(OP_VAR)
+                args.append(node.index)
+            else:
+                opcodes.append(OP_CONST)
+                args.append(len(constants))
+                constants.append(float(node.value))
+                if constant_nodes is not None:
+                    constant_nodes.append(node)
+            depth += 1
+            max_depth = max(max_depth, depth)
+        elif expanded:
+            opcodes.append(node.opcode + OP_OFFSET)
+            args.append(0)
+            if node.opcode in OperatorNode.BINARY_OPCODES:
+                depth -= 1
+        else:
+            stack.append((node, True))
+            if node.opcode in OperatorNode.BINARY_OPCODES:
+                stack.append((node.right, False))
+            stack.append((node.left, False))
+
+    return Program(
+        np.array(opcodes, dtype=np.uint8),
+        np.array(args, dtype=np.int32),
+        np.array(constants, dtype=np.float64),
+        max_depth,
+    )
+
+
+class StackMachine:
+    """Postfix interpreter working on a reusable preallocated stack of column buffers."""
+
+    def __init__(self):
+        self.buffer = np.empty((0, 0))
+
+    def reserve(self, stack_size: int, n_samples: int) -> np.ndarray:
+        """Return a (stack_size, n_samples) view, growing the buffer only when needed."""
+        rows, cols = self.buffer.shape
+        if rows < stack_size or cols < n_samples:
+            self.buffer = np.empty((max(rows, stack_size), max(cols, n_samples)))
+        return self.buffer[:stack_size, :n_samples]
+
+    def run(self, program: Program, X: np.ndarray) -> np.ndarray:
+        """Evaluate the program on every row of X and return a fresh prediction vector."""
+        X = np.asarray(X, dtype=float)
+        stack = self.reserve(program.stack_size, X.shape[0])
+        constants = program.constants
+        sp = 0
+        with np.errstate(all='ignore'):
+            for opcode, arg in zip(program.opcodes.tolist(), program.args.tolist()):
+                if opcode == OP_VAR:
+                    np.copyto(stack[sp], X[:, arg])
+                    sp += 1
+                elif opcode == OP_CONST:
+                    stack[sp].fill(constants[arg])
+                    sp += 1
+                elif opcode in BINARY_OPCODES:
+                    sp -= 1
+                    KERNELS[opcode](stack[sp - 1], stack[sp])
+                else:
+                    KERNELS[opcode](stack[sp - 1])
+        return stack[0].copy()
+
+
+def pack_programs(programs: list[Program]) -> tuple[np.ndarray, ...]:
+    """Concatenate programs into a few flat arrays, cheap to send to another process."""
+    lengths = np.array([len(program) for program in programs], dtype=np.int64)
+    n_constants = np.array([len(program.constants) for program in programs], dtype=np.int64)
+    stack_sizes = np.array([program.stack_size for program in programs], dtype=np.int64)
+    if not programs:
+        return lengths, n_constants, stack_sizes, np.empty(0, np.uint8), np.empty(0, np.int32), np.empty(0)
+    return (
+        lengths,
+        n_constants,
+        stack_sizes,
+        np.concatenate([program.opcodes for program in programs]),
+        np.concatenate([program.args for program in programs]),
+        np.concatenate([program.constants for program in programs]),
+    )
+
+def unpack_programs(packed: tuple[np.ndarray, ...]) -> list[Program]:
+    """Inverse of pack_programs; the returned programs are views into the packed arrays."""
+    lengths, n_constants, stack_sizes, opcodes, args, constants = packed
+    code_offsets = np.concatenate(([0], np.cumsum(lengths)))
+    constant_offsets = np.concatenate(([0], np.cumsum(n_constants)))
+    return [
+        Program(
+            opcodes[code_offsets[i]:code_offsets[i + 1]],
+            args[code_offsets[i]:code_offsets[i + 1]],
+            constants[constant_offsets[i]:constant_offsets[i + 1]],
+            int(stack_sizes[i]),
+        )
+        for i in range(len(lengths))
+    ]
+
+
+# Shared interpreter of this process; programs are run one at a time
+_machine = StackMachine()
+
+def run_program(program: Program, X: np.ndarray) -> np.ndarray:
+    """Run a compiled program with the process-wide stack machine."""
+    return _machine.run(program, X)
+
+def fold_constant(node: Node) -> float:
+    """Evaluate a variable-free subtree to a single constant through its compiled form."""
+    return float(run_program(compile_tree(node), np.empty((1, 0)))[0])
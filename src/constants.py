@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+
+from .node import Node
+from .compiler import compile_tree, run_program
+
+
+def _residuals(program, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Residuals of the clipped predictions, as used by the MSE objective."""
+    with np.errstate(over='ignore', invalid='ignore'):
+        return np.clip(run_program(program, X), -1e10, 1e10) - y
+
+def optimize_constants(
+        individual: Node,
+        X: np.ndarray,
+        y: np.ndarray,
+        time_budget: float = 0.05,
+        max_iterations: int = 20,
+) -> float:
+    """Tune the float constants of a tree with Levenberg-Marquardt, in place.
+
+    Constants are gathered into a parameter vector through the compiled
+    program, the Jacobian is estimated with forward finite differences on
+    vectorized predictions, and steps are only accepted when the MSE
+    decreases. The run stops after max_iterations or time_budget seconds.
+    The tuned constants are written back into the tree, and the final MSE
+    is returned.
+    """
+    deadline = time.perf_counter() + time_budget
+    constant_nodes = []
+    program = compile_tree(individual, constant_nodes)
+    theta = program.constants.copy()
+
+    residuals = _residuals(program, X, y)
+    cost = float(residuals @ residuals)
+    if not constant_nodes or not np.isfinite(cost):
+        return cost / len(y)
+
+    damping = 1e-3
+    for _ in range(max_iterations):
+        if time.perf_counter() > deadline:
+            break
+
+        # Forward-difference Jacobian, one column per constant
+        jacobian = np.empty((len(y), len(theta)))
+        for j in range(len(theta)):
+            step = 1e-6 * max(1.0, abs(theta[j]))
+            program.constants[:] = theta
+            program.constants[j] += step
+            jacobian[:, j] = (_residuals(program, X, y) - residuals) / step
+        if not np.isfinite(jacobian).all():
+            break
+
+        hessian = jacobian.T @ jacobian
+        gradient = jacobian.T @ residuals
+        improved = False
+        while damping < 1e10:
+            damped = hessian + damping * np.diag(np.diag(hessian) + 1e-12)
+            try:
+                delta = np.linalg.solve(damped, -gradient)
+            except np.linalg.LinAlgError:
+                damping *= 10
+                continue
+            program.constants[:] = theta + delta
+            new_residuals = _residuals(program, X, y)
+            new_cost = float(new_residuals @ new_residuals)
+            if np.isfinite(new_cost) and new_cost < cost:
+                theta, residuals, cost = theta + delta, new_residuals, new_cost
+                damping = max(damping / 10, 1e-12)
+                improved = True
+                break
+            damping *= 10
+        if not improved:
+            break
+
+    for node, value in zip(constant_nodes, theta.tolist()):
+        if node.value != value:
+            node.value = value
+    return cost / len(y)
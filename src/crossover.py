@@ -1,24 +1,28 @@
+import math
 import random
-from node import OperandNode, Node, get_all_nodes, OperatorNode
-from utils import find_parent
+from .node import OperandNode, Node, OperatorNode, random_node
+from .utils import find_parent
 
-def crossover(parent1: Node, parent2: Node) -> tuple[Node, Node]:
+def crossover(parent1: Node, parent2: Node, max_size: int | None = None, max_height: int | None = None) -> tuple[Node, Node]:
+    """Exchange a random subtree of each parent.
+
+    With a node budget (max_size) or a height budget (max_height, a single
+    leaf having height 1), the second crossover point is chosen by
+    size_fair_point so that both offspring stay within the budgets. When no
+    such point exists, the offspring are copies of the parents.
+    """
     # Clone the parents to avoid modifying the original trees
     parent1 = parent1.clone()
     parent2 = parent2.clone()
 
-    # Get all nodes from both parents
-    nodes1 = get_all_nodes(parent1)
-    nodes2 = get_all_nodes(parent2)
-
     # Randomly select crossover points
-    crossover_point1 = random.choice(nodes1)
-    while crossover_point1 is None:
-        crossover_point1 = random.choice(nodes1)
-
-    crossover_point2 = random.choice(nodes2)
-    while crossover_point2 is None:
-        crossover_point2 = random.choice(nodes2)
+    crossover_point1 = random_node(parent1)
+    if max_size is None and max_height is None:
+        crossover_point2 = random_node(parent2)
+    else:
+        crossover_point2 = size_fair_point(parent1, parent2, crossover_point1, max_size, max_height)
+        if crossover_point2 is None:
+            return parent1, parent2
 
     # Swap the subtrees if both crossover points are OperatorNodes
     if isinstance(crossover_point1, OperatorNode) and isinstance(crossover_point2, OperatorNode):
@@ -31,6 +35,35 @@ def crossover(parent1: Node, parent2: Node) -> tuple[Node, Node]:
 
     return parent1, parent2
 
+def size_fair_point(root1: Node, root2: Node, point1: Node, max_size: int | None = None,
+                    max_height: int | None = None, rng=random) -> Node | None:
+    """Pick the node of root2 to exchange with point1 of root1, or None if no node fits.
+
+    Candidates are size-fair (at most 1 + 2 * point1.size nodes, so a swap
+    cannot grow a subtree by more than about twice its size) and keep both
+    offspring within the node and height budgets. Sizes and heights are the
+    cached ones, so the candidates are found in one walk over root2.
+    """
+    max_size = math.inf if max_size is None else max_size
+    max_height = math.inf if max_height is None else max_height
+    size1, height1, depth1 = point1.size, point1.height, point1.depth
+    size_limit = min(1 + 2 * size1, max_size - root1.size + size1)
+    height_limit = max_height - depth1
+    size_floor = root2.size + size1 - max_size
+
+    candidates = []
+    stack = [(root2, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if (size_floor <= node.size <= size_limit and node.height <= height_limit
+                and depth + height1 <= max_height):
+            candidates.append(node)
+        if isinstance(node, OperatorNode):
+            stack.append((node.left, depth + 1))
+            if node.right is not None:
+                stack.append((node.right, depth + 1))
+    return rng.choice(candidates) if candidates else None
+
 def swap_subtrees(node1: OperatorNode, node2: OperatorNode):
     # Swap the left subtrees
     node1.left, node2.left = node2.left.clone(), node1.left.clone()
@@ -47,9 +80,10 @@ def swap_subtrees(node1: OperatorNode, node2: OperatorNode):
             node1.right = node2.right.clone()
             node2.right = None
 
-    # Swap the operator symbols and functions
-    node1.operator_symbol, node2.operator_symbol = node2.operator_symbol, node1.operator_symbol
-    node1.function, node2.function = node2.function, node1.function
+    # Swap the operators
+    node1.opcode, node2.opcode = node2.opcode, node1.opcode
+    node1.invalidate()
+    node2.invalidate()
 
 def swap_operands(node1: OperandNode, node2: OperandNode):
     # Swap the operand values
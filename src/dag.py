@@ -0,0 +1,133 @@
+import numpy as np
+
+from .node import Node, OperatorNode, OperandNode
+
+
+class SubexpressionDAG:
+    """Hash-consed DAG of every subtree of a population.
+
+    Structurally identical subtrees, within one individual or across several,
+    map to the same DAG vertex, so each of them is evaluated only once. With an
+    OutputCache, subtrees that still hold a valid output vector become leaves
+    of the DAG, and the vectors of the evaluated trees are kept on their nodes.
+    """
+
+    def __init__(self, population: list[Node], output_cache=None):
+        self.keys = {}       # structural key -> vertex id
+        self.vertices = []   # vertex id -> (opcode or None, operand value or child ids)
+        self.uses = []       # vertex id -> number of parents referencing it
+        self.roots = []      # individual index -> vertex id
+        self.sizes = []      # individual index -> number of nodes
+        self.total_nodes = 0
+        self.output_cache = output_cache
+        self.store_targets = []  # (node, vertex id) pairs whose output is kept on the node
+        self.reused_nodes = 0
+        for individual in population:
+            root, size = self._intern(individual)
+            self.roots.append(root)
+            self.sizes.append(size)
+            self.total_nodes += size
+
+    def _vertex(self, key, vertex):
+        """Return the id of the vertex with the given key, creating it if needed."""
+        vertex_id = self.keys.get(key)
+        if vertex_id is None:
+            vertex_id = self.keys[key] = len(self.vertices)
+            self.vertices.append(vertex)
+            self.uses.append(0)
+            if vertex[0] is not None:
+                for child in vertex[1]:
+                    self.uses[child] += 1
+        return vertex_id
+
+    def _intern(self, root: Node) -> tuple[int, int]:
+        """Intern every subtree of root, returning the root vertex id and the tree size."""
+        ids = []
+        size = 0
+        targets = set()
+        if self.output_cache is not None:
+            targets = {id(node) for node in self.output_cache.targets(root)}
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            cached = None
+            if not expanded and self.output_cache is not None:
+                cached = self.output_cache.lookup(node)
+            if cached is not None:
+                # Reuse the vector from a previous evaluation instead of the whole subtree
+                size += node.size
+                self.reused_nodes += node.size
+                ids.append(self._vertex(('o', id(cached)), (None, cached)))
+            elif isinstance(node, OperandNode):
+                size += 1
+                if node.index >= 0:
+                    ids.append(self._vertex(('x', node.index), (None, node.index)))
+                else:
+                    value = float(node.value)
+                    ids.append(self._vertex(('c', value), (None, value)))
+            elif expanded:
+                size += 1
+                if node.opcode in OperatorNode.BINARY_OPCODES:
+                    right = ids.pop()
+                    children = (ids.pop(), right)
+                else:
+                    children = (ids.pop(),)
+                ids.append(self._vertex((node.opcode,) + children, (node.opcode, children)))
+                if id(node) in targets:
+                    self.store_targets.append((node, ids[-1]))
+            else:
+                stack.append((node, True))
+                if node.opcode in OperatorNode.BINARY_OPCODES:
+                    stack.append((node.right, False))
+                stack.append((node.left, False))
+        return ids[0], size
+
+    @property
+    def unique_nodes(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Fraction of node evaluations saved by sharing subtrees."""
+        if self.total_nodes == 0:
+            return 0.0
+        return 1.0 - self.unique_nodes / self.total_nodes
+
+    def evaluate(self, X: np.ndarray, reduce) -> list:
+        """Evaluate every unique subtree once over X and reduce each individual's predictions.
+
+        reduce is called with the full prediction vector of each distinct root
+        and its result is returned per individual. Intermediate vectors are
+        released as soon as their last parent has been computed.
+        """
+        X = np.asarray(X, dtype=float)
+        n_samples = X.shape[0]
+        root_ids = set(self.roots)
+        remaining = list(self.uses)
+        values = {}
+        reduced = {}
+        retain = {vertex_id for _, vertex_id in self.store_targets}
+        retained = {}
+        with np.errstate(all='ignore'):
+            # Vertices are created in post-order, so children always come first
+            for vertex_id, (opcode, payload) in enumerate(self.vertices):
+                if opcode is None:
+                    value = X[:, payload] if isinstance(payload, int) else payload
+                else:
+                    function = OperatorNode.FUNCTIONS[opcode]
+                    value = function(*(values[child] for child in payload))
+                    for child in payload:
+                        remaining[child] -= 1
+                        if remaining[child] == 0:
+                            del values[child]
+                if vertex_id in root_ids:
+                    reduced[vertex_id] = reduce(np.broadcast_to(np.asarray(value, dtype=float), (n_samples,)))
+                if vertex_id in retain and np.ndim(value) == 1:
+                    retained[vertex_id] = value
+                if remaining[vertex_id] > 0:
+                    values[vertex_id] = value
+
+        for node, vertex_id in self.store_targets:
+            if vertex_id in retained:
+                self.output_cache.store(node, retained[vertex_id])
+        return [reduced[root] for root in self.roots]
@@ -0,0 +1,129 @@
+import numpy as np
+
+from .node import Node, OperatorNode, OperandNode
+from .compiler import OP_VAR, OP_CONST, OP_OFFSET
+
+# Number of children of every opcode, in the instruction set shared with compiler.py
+ARITY = np.array(
+    [0] * OP_OFFSET + [2 if op in OperatorNode.BINARY_OPCODES else 1 for op in range(len(OperatorNode.SYMBOLS))],
+    dtype=np.int64,
+)
+
+
+class EncodedTree:
+    """Compact prefix-order encoding of an expression tree.
+
+    Three aligned arrays hold one entry per node: the opcode (uint8), the
+    variable index (int32) and the constant value (float64). Cloning is an
+    array copy and every subtree is a contiguous slice.
+    """
+
+    __slots__ = ('opcodes', 'args', 'values')
+
+    def __init__(self, opcodes, args, values):
+        self.opcodes = opcodes
+        self.args = args
+        self.values = values
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def clone(self) -> 'EncodedTree':
+        return EncodedTree(self.opcodes.copy(), self.args.copy(), self.values.copy())
+
+    def subtree_end(self, start: int) -> int:
+        """Index one past the last node of the subtree rooted at start."""
+        # Each node opens arity - 1 extra slots; the subtree ends when no slot is left open
+        open_slots = np.cumsum(ARITY[self.opcodes[start:]] - 1)
+        return start + int(np.argmax(open_slots == -1)) + 1
+
+    def subtree(self, start: int) -> 'EncodedTree':
+        """Copy of the subtree rooted at start."""
+        end = self.subtree_end(start)
+        return EncodedTree(self.opcodes[start:end].copy(), self.args[start:end].copy(), self.values[start:end].copy())
+
+    def replace(self, start: int, subtree: 'EncodedTree') -> 'EncodedTree':
+        """New tree with the subtree rooted at start replaced by another encoded tree."""
+        end = self.subtree_end(start)
+        return EncodedTree(
+            np.concatenate((self.opcodes[:start], subtree.opcodes, self.opcodes[end:])),
+            np.concatenate((self.args[:start], subtree.args, self.args[end:])),
+            np.concatenate((self.values[:start], subtree.values, self.values[end:])),
+        )
+
+
+def encode(root: Node) -> EncodedTree:
+    """Encode a tree in prefix order."""
+    opcodes, args, values = [], [], []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, OperatorNode):
+            opcodes.append(node.opcode + OP_OFFSET)
+            args.append(0)
+            values.append(0.0)
+            if node.opcode in OperatorNode.BINARY_OPCODES:
+                stack.append(node.right)
+            stack.append(node.left)
+        elif node.index >= 0:
+            opcodes.append(OP_VAR)
+            args.append(node.index)
+            values.append(0.0)
+        else:
+            opcodes.append(OP_CONST)
+            args.append(0)
+            values.append(float(node.value))
+    return EncodedTree(
+        np.array(opcodes, dtype=np.uint8),
+        np.array(args, dtype=np.int32),
+        np.array(values, dtype=np.float64),
+    )
+
+def decode(encoded: EncodedTree) -> Node:
+    """Rebuild a Node tree from its prefix encoding."""
+    root = None
+    parents = []
+    for opcode, arg, value in zip(encoded.opcodes.tolist(), encoded.args.tolist(), encoded.values.tolist()):
+        if opcode == OP_VAR:
+            node = OperandNode(f'x_{arg}')
+        elif opcode == OP_CONST:
+            node = OperandNode(value)
+        else:
+            node = OperatorNode(OperatorNode.SYMBOLS[opcode - OP_OFFSET])
+
+        if parents:
+            parent = parents[-1]
+            if parent.left is None:
+                parent.left = node
+            else:
+                parent.right = node
+            if parent.left is not None and (parent.right is not None or parent.opcode not in OperatorNode.BINARY_OPCODES):
+                parents.pop()
+        else:
+            root = node
+
+        if opcode >= OP_OFFSET:
+            parents.append(node)
+    return root
+
+def encode_population(population: list[Node]) -> tuple[np.ndarray, ...]:
+    """Encode a population into flat (offsets, opcodes, args, values) arrays."""
+    trees = [encode(ind) for ind in population]
+    offsets = np.zeros(len(trees) + 1, dtype=np.int64)
+    np.cumsum([len(tree) for tree in trees], out=offsets[1:])
+    if not trees:
+        return offsets, np.empty(0, np.uint8), np.empty(0, np.int32), np.empty(0, np.float64)
+    return (
+        offsets,
+        np.concatenate([tree.opcodes for tree in trees]),
+        np.concatenate([tree.args for tree in trees]),
+        np.concatenate([tree.values for tree in trees]),
+    )
+
+def decode_population(packed: tuple[np.ndarray, ...]) -> list[Node]:
+    """Inverse of encode_population."""
+    offsets, opcodes, args, values = packed
+    return [
+        decode(EncodedTree(opcodes[start:end], args[start:end], values[start:end]))
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
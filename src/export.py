@@ -0,0 +1,167 @@
+from collections import Counter
+
+import numpy as np
+
+from .node import Node, OperatorNode, OperandNode, protected_div, structural_key, get_all_nodes
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+BACKENDS = ('numpy', 'numexpr')
+
+# Generated code reproduces the protected semantics of OperatorNode.OPERATORS
+NUMPY_TEMPLATES = {
+    '+': '({0} + {1})',
+    '-': '({0} - {1})',
+    '*': '({0} * {1})',
+    '/': 'protected_div({0}, {1})',
+    'sin': 'np.sin(np.clip({0}, -1e10, 1e10))',
+    'cos': 'np.cos(np.clip({0}, -1e10, 1e10))',
+    'tan': 'np.tan(np.clip({0}, -1e10, 1e10))',
+    'log': 'np.log(np.clip({0}, 1e-10, None))',
+    'exp': 'np.exp(np.clip({0}, -700, 700))',
+    'sqrt': 'np.sqrt(np.clip({0}, 0, None))',
+    'abs': 'np.abs({0})',
+}
+
+# numexpr has no clip: bounds are applied with where, which keeps NaN like np.clip
+NUMEXPR_TEMPLATES = {
+    '+': '({0} + {1})',
+    '-': '({0} - {1})',
+    '*': '({0} * {1})',
+    '/': 'where({1} != 0, {0} / {1}, 1.0)',
+    'sin': 'sin(where({0} < -1e10, -1e10, where({0} > 1e10, 1e10, {0})))',
+    'cos': 'cos(where({0} < -1e10, -1e10, where({0} > 1e10, 1e10, {0})))',
+    'tan': 'tan(where({0} < -1e10, -1e10, where({0} > 1e10, 1e10, {0})))',
+    'log': 'log(where({0} < 1e-10, 1e-10, {0}))',
+    'exp': 'exp(where({0} < -700, -700, where({0} > 700, 700, {0})))',
+    'sqrt': 'sqrt(where({0} < 0, 0, {0}))',
+    'abs': 'abs({0})',
+}
+
+PROTECTED_DIV_SOURCE = '''def protected_div(a, b):
+    """Protected division, returning 1 wherever the divisor is zero."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b != 0, np.divide(a, b), 1.0)
+'''
+
+
+def _repeats_argument(template: str) -> bool:
+    return any(template.count('{%d}' % i) > 1 for i in range(2))
+
+def to_source(root: Node, name: str = 'f', backend: str = 'numpy') -> str:
+    """Python source of a vectorized function computing the tree on x of shape (n_variables, n_samples).
+
+    Operator subtrees occurring more than once are computed once into
+    temporaries. With the numexpr backend, each temporary is one
+    numexpr.evaluate call, and the arguments that a template repeats are
+    hoisted as well so that no subexpression is written twice.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    templates = NUMPY_TEMPLATES if backend == 'numpy' else NUMEXPR_TEMPLATES
+
+    keys = {}
+    counts = Counter()
+    for node in get_all_nodes(root):
+        if isinstance(node, OperatorNode):
+            keys[node] = structural_key(node)
+            counts[keys[node]] += 1
+
+    lines = []
+    texts = {}  # structural key -> expression or temporary name
+
+    def temporary(expression: str, python: bool = False) -> str:
+        variable = f't{len(lines)}'
+        if backend == 'numexpr' and not python:
+            expression = f"numexpr.evaluate({expression!r})"
+        lines.append(f'    {variable} = {expression}')
+        return variable
+
+    def operand(node: OperandNode) -> str:
+        if node.index >= 0:
+            return f'x{node.index}' if backend == 'numexpr' else f'x[{node.index}]'
+        value = float(node.value)
+        if not np.isfinite(value):
+            # inf and nan have no literal; numexpr reads the temporary from the function locals
+            return temporary(f"float('{value}')", python=True)
+        return repr(value)
+
+    # Iterative post-order walk, children before their parent
+    stack = [(root, False)]
+    results = []
+    while stack:
+        node, expanded = stack.pop()
+        if isinstance(node, OperandNode):
+            results.append(operand(node))
+        elif keys[node] in texts:
+            results.append(texts[keys[node]])
+        elif not expanded:
+            stack.append((node, True))
+            if node.is_binary:
+                stack.append((node.right, False))
+            stack.append((node.left, False))
+        else:
+            arguments = [results.pop()]
+            if node.is_binary:
+                arguments.insert(0, results.pop())
+            template = templates[node.operator_symbol]
+            if backend == 'numexpr' and _repeats_argument(template):
+                arguments = [argument if argument.isidentifier() or argument[-1].isdigit() else temporary(argument)
+                             for argument in arguments]
+            expression = template.format(*arguments)
+            if counts[keys[node]] > 1 and node is not root:
+                expression = temporary(expression)
+            texts[keys[node]] = expression
+            results.append(expression)
+
+    result = results.pop()
+    if backend == 'numexpr':
+        result = f"numexpr.evaluate({result!r})"
+    n_variables = max((node.index for node in get_all_nodes(root) if isinstance(node, OperandNode)), default=-1) + 1
+
+    body = [f'def {name}(x):']
+    if backend == 'numexpr' and n_variables:
+        body.append(f"    {', '.join(f'x{i}' for i in range(n_variables))}, = x[:{n_variables}]")
+    body.extend(lines)
+    if n_variables == 0:
+        # A constant expression still returns one value per sample
+        body.append(f'    return np.full(np.shape(x)[1:], {result})')
+    else:
+        body.append(f'    return {result}')
+    return '\n'.join(body) + '\n'
+
+def compile_expression(root: Node, backend: str = 'auto'):
+    """Compile a tree into a vectorized function of x with shape (n_variables, n_samples).
+
+    The auto backend uses numexpr when it is installed, NumPy otherwise.
+    """
+    if backend == 'auto':
+        backend = 'numexpr' if numexpr is not None else 'numpy'
+    if backend == 'numexpr' and numexpr is None:
+        raise ImportError("The numexpr backend requires the numexpr package")
+    namespace = {'np': np, 'numexpr': numexpr, 'protected_div': protected_div}
+    exec(compile(to_source(root, 'f', backend), '<gp-export>', 'exec'), namespace)
+    function = namespace['f']
+    function.__doc__ = str(root)
+    return function
+
+def write_module(path: str, functions: dict[str, Node], backend: str = 'numpy', header: str | None = None):
+    """Write a module defining one function per tree, in the style of s331445.py.
+
+    header, if given, is written as a comment block below the imports (for
+    instance the genetic_programming call that produced the trees).
+    """
+    imports = ['import numpy as np']
+    if backend == 'numexpr':
+        imports.append('import numexpr')
+    parts = ['\n'.join(imports) + '\n']
+    if header:
+        parts.append('\n'.join(f'# {line}'.rstrip() for line in header.splitlines()) + '\n')
+    if backend == 'numpy':
+        parts.append(PROTECTED_DIV_SOURCE)
+    parts.extend(to_source(root, name, backend) for name, root in functions.items())
+    with open(path, 'w') as file:
+        file.write('\n\n'.join(parts))
@@ -1,33 +1,146 @@
-# Cache to store evaluated results
+import sys
+from collections import OrderedDict
+
 import numpy as np
 
-from node import Node, get_all_nodes
+from .node import Node, structural_key
+from .compiler import compile_tree, run_program
+from .dag import SubexpressionDAG
+from .streaming import ChunkedDataset, streaming_mse
+
+
+class FitnessCache:
+    """LRU cache mapping the structural hash of a tree to its (mse, complexity).
+
+    The cache lives in the parent process and persists across generations, so
+    elites and offspring identical to an already evaluated tree are not
+    evaluated again. It is bounded both by entry count and by estimated memory.
+    """
+
+    # Approximate per-entry overhead of the OrderedDict links and the float/int objects
+    ENTRY_OVERHEAD = 128
+
+    def __init__(self, max_entries: int = 200_000, max_bytes: int = 64 * 2 ** 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def _entry_size(self, key, value) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(value) + self.ENTRY_OVERHEAD
+
+    def get(self, key: bytes) -> tuple[float, int] | None:
+        """Return the cached objectives for key, or None, updating the counters."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: bytes, value: tuple[float, int]):
+        """Store objectives for key, evicting the least recently used entries if needed."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = value
+        self.bytes += self._entry_size(key, value)
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            old_key, old_value = self.entries.popitem(last=False)
+            self.bytes -= self._entry_size(old_key, old_value)
 
-cache = {}
+    def lookup(self, population: list[Node]) -> tuple[list[bytes], list[tuple[float, int] | None]]:
+        """Return the structural keys of a population and the cached objectives (or None) of each."""
+        keys = [structural_key(ind) for ind in population]
+        return keys, [self.get(key) for key in keys]
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        self.entries.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+cache = FitnessCache()
 
 def clear_cache():
     """Clear the cache."""
     cache.clear()
 
-def evaluate_individual(individual, x):
-    """Evaluate an individual with caching."""
-    key = (individual, tuple(x))
-    if key in cache:
-        return cache[key]
-    result = individual.evaluate(x)
-    cache[key] = result
-    return result
-
-def get_objectives(individual: Node, X: np.ndarray, y: np.ndarray) -> tuple[Node, float, int]:
-    """Calculate the objectives (MSE and complexity) for an individual."""
-    # Evaluate predictions for all samples in X
-    predictions = np.array([evaluate_individual(individual, tuple(x)) for x in X])
+def predict(individual: Node, X: np.ndarray) -> np.ndarray:
+    """Evaluate an individual on the whole data matrix through its compiled postfix form."""
+    return run_program(compile_tree(individual), X)
+
+def get_objectives(individual: Node, X: np.ndarray | ChunkedDataset, y: np.ndarray | None = None) -> tuple[Node, float, int]:
+    """Calculate the objectives (MSE and complexity) for an individual, X being arrays or a ChunkedDataset."""
+    if isinstance(X, ChunkedDataset):
+        (mse,), _ = streaming_mse([individual], X)
+    else:
+        # Evaluate predictions for all samples in X at once
+        mse = mean_squared_error(predict(individual, X), y)
+
+    # Complexity (number of nodes in the tree) is cached on the root
+    complexity = individual.size
+
+    return individual, mse, complexity
+
+def mean_squared_error(predictions: np.ndarray, y: np.ndarray) -> float:
+    """Mean squared error of clipped predictions."""
     predictions_clipped = np.clip(predictions, -1e10, 1e10)
+    with np.errstate(over='ignore', invalid='ignore'):
+        return float(np.mean((y - predictions_clipped) ** 2))
+
+def evaluate_population(
+        population: list[Node],
+        X: np.ndarray | ChunkedDataset,
+        y: np.ndarray | None,
+        fitness_cache: FitnessCache | None = None,
+        output_cache=None,
+) -> tuple[list[tuple[Node, float, int]], SubexpressionDAG]:
+    """Calculate the objectives of a whole population, sharing common subexpressions.
+
+    Individuals found in fitness_cache are not evaluated again, and subtrees
+    holding an output vector in output_cache are not recomputed. Returns the same
+    (individual, mse, complexity) tuples as get_objectives, along with the DAG
+    of the evaluated individuals so callers can report its dedup ratio.
+    With a ChunkedDataset as X, the MSE is streamed over its blocks and no
+    DAG is returned.
+    """
+    if fitness_cache is None:
+        if isinstance(X, ChunkedDataset):
+            mses, sizes = streaming_mse(population, X)
+            return list(zip(population, mses, sizes)), None
+        dag = SubexpressionDAG(population, output_cache)
+        mses = dag.evaluate(X, lambda predictions: mean_squared_error(predictions, y))
+        return list(zip(population, mses, dag.sizes)), dag
 
-    # Calculate mean squared error
-    mse = np.mean((y - predictions_clipped) ** 2)
+    keys, results = fitness_cache.lookup(population)
+    missing = [i for i, result in enumerate(results) if result is None]
 
-    # Calculate complexity (number of nodes in the tree)
-    complexity = len(get_all_nodes(individual))
+    dag = None
+    if isinstance(X, ChunkedDataset):
+        mses, sizes = streaming_mse([population[i] for i in missing], X)
+    else:
+        dag = SubexpressionDAG([population[i] for i in missing], output_cache)
+        mses = dag.evaluate(X, lambda predictions: mean_squared_error(predictions, y))
+        sizes = dag.sizes
+    for i, mse, complexity in zip(missing, mses, sizes):
+        results[i] = (mse, complexity)
+        fitness_cache.put(keys[i], results[i])
 
-    return individual, float(mse), complexity
\ No newline at end of file
+    return [(ind, mse, complexity) for ind, (mse, complexity) in zip(population, results)], dag
\ No newline at end of file
@@ -0,0 +1,99 @@
+import numpy as np
+
+from .node import OperatorNode
+from .compiler import OP_VAR, OP_CONST, OP_OFFSET
+from .encoding import ARITY
+
+# Shape parameters of random trees, shared with utils.generate_random_tree
+CONSTANT_PROBABILITY = 0.3
+OPERATOR_PROBABILITY = 0.6
+OPERATOR_FIRST_PROBABILITY = 0.9
+CONSTANT_RANGE = (-10, 10)
+N_OPERATORS = len(OperatorNode.SYMBOLS)
+
+
+def ramped_half_and_half(
+        n_trees: int,
+        n_variables: int,
+        max_depth: int,
+        rng: np.random.Generator,
+        min_depth: int = 2,
+) -> tuple[np.ndarray, ...]:
+    """Generate n_trees random trees as packed (offsets, opcodes, args, values) arrays.
+
+    Depth limits are ramped from min_depth to max_depth, and at each depth half
+    of the trees are full (operators down to the limit) and half are grown
+    (operators drawn with the probabilities of generate_random_tree). The trees
+    are built one level at a time for the whole batch with vectorized draws,
+    then laid out in prefix order: the layout matches encode_population, so
+    decode_population turns the result into Node trees.
+    """
+    if n_trees == 0:
+        return np.zeros(1, dtype=np.int64), np.empty(0, np.uint8), np.empty(0, np.int32), np.empty(0, np.float64)
+    min_depth = min(min_depth, max_depth)
+    ramp = np.arange(n_trees)
+    depth_limit = min_depth + (ramp // 2) % (max_depth - min_depth + 1)
+    full = ramp % 2 == 0
+    order = rng.permutation(n_trees)
+    depth_limit, full = depth_limit[order], full[order]
+
+    # Level-order generation: every node knows its tree, parent and whether it is a right child
+    level_trees = np.arange(n_trees)
+    level_parents = np.full(n_trees, -1)
+    level_right = np.zeros(n_trees, dtype=bool)
+    levels, opcodes, parents, right = [], [], [], []
+    n_nodes = 0
+    depth = 0
+    while len(level_trees):
+        count = len(level_trees)
+        limit = depth_limit[level_trees]
+        grow_probability = OPERATOR_FIRST_PROBABILITY if depth == 0 else OPERATOR_PROBABILITY
+        is_operator = (depth < limit) & (full[level_trees] | (rng.random(count) < grow_probability))
+        is_constant = ~is_operator & (rng.random(count) < CONSTANT_PROBABILITY)
+        level_opcodes = np.where(is_operator, rng.integers(0, N_OPERATORS, count) + OP_OFFSET,
+                                 np.where(is_constant, OP_CONST, OP_VAR))
+
+        levels.append((n_nodes, n_nodes + count))
+        opcodes.append(level_opcodes)
+        parents.append(level_parents)
+        right.append(level_right)
+
+        # Children of this level's operators, left child first
+        arity = ARITY[level_opcodes]
+        ids = n_nodes + np.arange(count)
+        level_parents = np.repeat(ids, arity)
+        level_right = np.zeros(len(level_parents), dtype=bool)
+        level_right[1:] = level_parents[1:] == level_parents[:-1]
+        level_trees = np.repeat(level_trees, arity)
+        n_nodes += count
+        depth += 1
+
+    opcodes = np.concatenate(opcodes)
+    parents = np.concatenate(parents)
+    right = np.concatenate(right)
+
+    # Subtree sizes, accumulated from the deepest level up
+    sizes = np.ones(n_nodes, dtype=np.int64)
+    for start, end in reversed(levels[1:]):
+        np.add.at(sizes, parents[start:end], sizes[start:end])
+
+    # Prefix positions, top-down: a left child follows its parent, a right child follows the left subtree
+    offsets = np.zeros(n_trees + 1, dtype=np.int64)
+    np.cumsum(sizes[:n_trees], out=offsets[1:])
+    positions = np.empty(n_nodes, dtype=np.int64)
+    positions[:n_trees] = offsets[:-1]
+    for start, end in levels[1:]:
+        ids = np.arange(start, end)
+        positions[start:end] = positions[parents[start:end]] + 1
+        right_ids = ids[right[start:end]]
+        positions[right_ids] += sizes[right_ids - 1]
+
+    packed_opcodes = np.empty(n_nodes, dtype=np.uint8)
+    packed_args = np.zeros(n_nodes, dtype=np.int32)
+    packed_values = np.zeros(n_nodes, dtype=np.float64)
+    packed_opcodes[positions] = opcodes
+    variables = positions[opcodes == OP_VAR]
+    packed_args[variables] = rng.integers(0, n_variables, len(variables))
+    constants = positions[opcodes == OP_CONST]
+    packed_values[constants] = np.round(rng.uniform(*CONSTANT_RANGE, len(constants)), 2)
+    return offsets, packed_opcodes, packed_args, packed_values
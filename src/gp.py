@@ -1,11 +1,22 @@
+import os
 import random
 import time
-from joblib import Parallel, delayed
-from crossover import crossover
-from mutations import mutate
-from selection import multi_objective_selection
-from utils import *
-from fitness import get_objectives, clear_cache
+import numpy as np
+from .crossover import crossover
+from .mutations import mutate
+from .selection import multi_objective_selection, tarpeian, double_tournament, BLOAT_CONTROLS
+from .archive import ParetoArchive
+from .utils import initialize_population, simplify_expression, trim_population
+from .fitness import evaluate_population, FitnessCache
+from .compiler import compile_tree, pack_programs
+from .incremental import OutputCache
+from .racing import race_population
+from .constants import optimize_constants
+from .semantic import SemanticDeduplicator
+from .streaming import ChunkedDataset
+from .instrumentation import Instrumentation, print_timings
+from .checkpoint import CheckpointWriter, load_checkpoint
+from .node import structural_key
 
 def genetic_programming(
         X, y,
@@ -17,141 +28,482 @@ def genetic_programming(
         elitism=True,
         elitism_size=3,
         max_no_improvement=5,
-        filename=None,
+        checkpoint_file=None,
+        checkpoint_every=10,
+        resume=False,
+        migration=None,
+        offspring_jobs=0,
+        offspring_batch_size=64,
+        archive=None,
+        fitness_cache=None,
+        n_jobs=1,
+        output_cache_bytes=0,
+        racing=False,
+        racing_subsample=256,
+        racing_confidence=0.99,
+        constant_optimization_interval=0,
+        constant_optimization_budget=0.05,
+        semantic_dedup=False,
+        semantic_probe_size=64,
+        max_size=None,
+        bloat_control=None,
+        tarpeian_rate=0.3,
+        fitness_tournament_size=7,
+        parsimony_size=1.4,
+        instrumentation=None,
         verbose=True,
 ):
     start_time = time.time()
-    n_variables = len(X[0])
+    if fitness_cache is None:
+        fitness_cache = FitnessCache()
+
+    # A ChunkedDataset is streamed block by block; the features below that keep X in memory need arrays
+    streaming = isinstance(X, ChunkedDataset)
+    if streaming and (n_jobs != 1 or output_cache_bytes or racing or semantic_dedup):
+        raise ValueError("A ChunkedDataset cannot be combined with n_jobs, output_cache_bytes, racing or semantic_dedup")
+    n_variables = X.n_variables if streaming else len(X[0])
+    if n_jobs != 1 and (racing or output_cache_bytes):
+        raise ValueError("racing and output_cache_bytes need in-process evaluation (n_jobs=1)")
+    if bloat_control not in BLOAT_CONTROLS:
+        raise ValueError(f"Unknown bloat control {bloat_control!r}, expected one of {BLOAT_CONTROLS}")
+
+    # Crossover keeps offspring within max_size nodes and max_depth levels below the root
+    max_height = max_depth + 1
+
+    # Constants are tuned in memory, on the first block of a streamed dataset
+    X_tune, y_tune = X.head() if streaming and constant_optimization_interval else (X, y)
+
+    # Subtree outputs kept on the nodes, so offspring only recompute what their edits touched
+    output_cache = None
+    if output_cache_bytes:
+        output_cache = OutputCache(X, output_cache_bytes)
+        output_cache.plan(pop_size)
 
-    # Initialize population
-    if filename is not None:
-        population = import_individuals_from_file(filename)
-    else:
-        population = initialize_population(pop_size, n_variables, max_depth)
+    # Batched random trees for initialization, restarts and refills
+    generation_rng = np.random.default_rng(random.getrandbits(64))
 
+    # Racing scores candidates on growing random subsamples before the full data
+    racing_rng = np.random.default_rng(random.getrandbits(64)) if racing else None
+    full_evaluations_saved = 0
+
+    # Semantic deduplication on a fixed probe subset, whose statistics only racing reuses
+    deduplicator = None
+    if semantic_dedup:
+        deduplicator = SemanticDeduplicator(X, y, semantic_probe_size, np.random.default_rng(random.getrandbits(64)))
+
+    # Per-generation stage timings and counters; verbose runs print the timings
+    instruments = instrumentation if instrumentation is not None else Instrumentation()
     if verbose:
-        init_pop_time = time.time()
-        print(f"Population Init Time: {init_pop_time - start_time:.6f}")
+        instruments.add_sink(print_timings)
 
-    best_fitness_values = []
-    best_individuals = []
-    gens_without_improvement = 0
+    def simplified(individual):
+        with instruments.stage('simplify'):
+            return simplify_expression(individual)
 
-    for gen in range(generations):
-        clear_cache()
-        init_pop_time = time.time()
+    def evaluate(population):
+        """Evaluate in the worker pool, or in-process through the shared-subtree DAG.
 
-        # Evaluate fitness of the population
-        objectives = Parallel(n_jobs=-1)(delayed(get_objectives)(ind, X, y) for ind in population)
-        objectives_dict = {ind: (mse, complexity) for ind, mse, complexity in sorted(objectives, key=lambda x: (x[1], x[2]))}
+        Also returns the set of individuals whose MSE is only a racing
+        estimate on a subsample.
+        """
+        nonlocal full_evaluations_saved
+        if pool is not None:
+            return pool.evaluate(population, fitness_cache), None, set()
+        if racing:
+            objectives, estimated, dag, saved = race_population(
+                population, X, y, fitness_cache, output_cache,
+                subsample_size=racing_subsample, confidence=racing_confidence, rng=racing_rng,
+                probe=deduplicator,
+            )
+            full_evaluations_saved += saved
+            instruments.set('full_evaluations_saved', saved)
+            if verbose:
+                print(f"Racing: {saved} full evaluations saved ({full_evaluations_saved} in total)")
+            return objectives, dag, {ind for (ind, _, _), flag in zip(objectives, estimated) if flag}
+        objectives, dag = evaluate_population(population, X, y, fitness_cache, output_cache)
+        return objectives, dag, set()
 
-        if verbose:
-            fitnesses_evaluation_time = time.time()
-            print(f"Fitness Evaluation Time: {fitnesses_evaluation_time - init_pop_time:.6f}")
+    def best_of(objectives_dict, estimated):
+        """The first individual of a sorted objectives dict whose MSE is a full-data result."""
+        return next((ind for ind in objectives_dict if ind not in estimated), next(iter(objectives_dict)))
 
-        # Track the best individual
-        best_individual = list(objectives_dict.keys())[0]
-        best_fitness = objectives_dict[best_individual][0]
+    def rng_state():
+        """Everything a resumed run needs to draw the same random numbers."""
+        return {
+            'random': random.getstate(),
+            'numpy': np.random.get_state(),
+            'generation': generation_rng.bit_generator.state,
+            'racing': racing_rng.bit_generator.state if racing_rng is not None else None,
+            'probe': (deduplicator.rows, deduplicator.stats) if deduplicator is not None else None,
+        }
 
-        if len(best_fitness_values) > 0 and best_fitness_values[-1] == best_fitness:
-            gens_without_improvement += 1
-        else:
-            gens_without_improvement = 0
+    def restore_rng_state(state):
+        random.setstate(state['random'])
+        np.random.set_state(state['numpy'])
+        generation_rng.bit_generator.state = state['generation']
+        if racing_rng is not None and state['racing'] is not None:
+            racing_rng.bit_generator.state = state['racing']
+        if deduplicator is not None and state['probe'] is not None:
+            deduplicator.rows, deduplicator.stats = state['probe']
+            deduplicator.X_probe, deduplicator.y_probe = X[deduplicator.rows], y[deduplicator.rows]
 
-        best_fitness_values.append(best_fitness)
-        best_individuals.append(best_individual)
+    # Worker processes and the writer thread are only started inside the try, whose finally stops them
+    pool = offspring_pool = writer = None
+    try:
+        checkpoint = load_checkpoint(checkpoint_file) if resume and checkpoint_file is not None and os.path.exists(checkpoint_file) else None
+        writer = CheckpointWriter(checkpoint_file) if checkpoint_file is not None else None
+
+        # Long-lived evaluation pool, created once for the whole run
+        if n_jobs != 1:
+            from .pool import EvaluationPool
+            pool = EvaluationPool(X, y, n_jobs)
+
+        # Offspring produced in seeded batches on worker processes, reproducible for any worker count
+        if offspring_jobs:
+            from .variation import OffspringPool
+            offspring_pool = OffspringPool(offspring_jobs, offspring_batch_size)
+
+        best_fitness_values = []
+        best_individuals = []
+        gens_without_improvement = 0
+        start_gen = 0
+        resumed_objectives = None
+        resumed_estimated = set()
 
-        print(f"Generation {gen+1}: Best Fitness = {best_fitness:.6f}")
-        if best_fitness < 0.0001:
-            return best_individual, best_fitness, best_fitness_values
+        # Initialize population, or pick up from the last checkpoint with its fitness already known
+        if checkpoint is not None:
+            population = checkpoint.population
+            resumed_objectives = list(zip(population, checkpoint.mse.tolist(), checkpoint.complexity.tolist()))
+            resumed_estimated = {ind for ind, flag in zip(population, checkpoint.state['estimated']) if flag}
+            if checkpoint.state['fitness_cache'] is not None:
+                for key, value in checkpoint.state['fitness_cache']:
+                    fitness_cache.put(key, value)
+            else:
+                for ind, mse, complexity, cached in zip(population, checkpoint.mse.tolist(), checkpoint.complexity.tolist(), checkpoint.state['cached']):
+                    if cached:
+                        fitness_cache.put(structural_key(ind), (mse, complexity))
+            best_fitness_values = checkpoint.state['best_fitness_values']
+            best_individuals = checkpoint.best_individuals
+            gens_without_improvement = checkpoint.state['gens_without_improvement']
+            start_gen = checkpoint.generation
+            restore_rng_state(checkpoint.state['rng'])
+            if verbose:
+                print(f"Resumed from {checkpoint_file} at generation {start_gen + 1}")
+        else:
+            population = initialize_population(pop_size, n_variables, max_depth, generation_rng)
 
-        # Select individuals for the next generation
-        selected = multi_objective_selection(objectives_dict)
         if verbose:
-            selection_time = time.time()
-            print(f"Selection Time: {selection_time - fitnesses_evaluation_time:.6f}")
+            init_pop_time = time.time()
+            print(f"Population Init Time: {init_pop_time - start_time:.6f}")
 
-        # Create next generation
-        next_generation = []
+        for gen in range(start_gen, generations):
+            with instruments.generation(gen):
+                # Evaluate fitness of the population
+                resumed = resumed_objectives is not None
+                hits, misses = fitness_cache.hits, fitness_cache.misses
+                with instruments.stage('evaluation'):
+                    if resumed:
+                        objectives, dag, estimated = resumed_objectives, None, resumed_estimated
+                        resumed_objectives = None
+                    else:
+                        objectives, dag, estimated = evaluate(population)
+                sizes = [complexity for _, _, complexity in objectives]
+                instruments.set('evaluations', fitness_cache.misses - misses)
+                instruments.set('cache_hits', fitness_cache.hits - hits)
+                instruments.set('mean_size', sum(sizes) / len(sizes))
+                instruments.set('max_size', max(sizes))
+                if dag is not None:
+                    evaluation_time = instruments.record['timings']['evaluation']
+                    instruments.set('nodes_evaluated', dag.unique_nodes)
+                    instruments.set('nodes_per_second', dag.unique_nodes / evaluation_time if evaluation_time > 0 else None)
 
-        # Elitism
-        if elitism:
-            top_individuals = Parallel(n_jobs=-1)(
-                delayed(simplify_expression)(pop.clone())
-                for pop in sorted(objectives_dict.keys(), key=lambda ind: objectives_dict[ind])[:elitism_size]
-            )
-            next_generation.extend(top_individuals)
+                if writer is not None and not resumed and gen % checkpoint_every == 0:
+                    _, mses, complexities = zip(*objectives)
+                    writer.write(gen, population, mses, complexities, best_individuals, {
+                        'rng': rng_state(),
+                        'cached': [structural_key(ind) in fitness_cache for ind in population],
+                        'estimated': [ind in estimated for ind in population],
+                        # Racing drops candidates based on what the whole cache holds, so it is saved in LRU order
+                        'fitness_cache': list(fitness_cache.entries.items()) if racing else None,
+                        'best_fitness_values': best_fitness_values,
+                        'gens_without_improvement': gens_without_improvement,
+                    })
 
-        if gens_without_improvement > max_no_improvement:
-            if elitism:
-                next_generation.extend(objectives_dict.keys()[elitism_size:pop_size * 0.6])
-            else:
-                next_generation.extend(objectives_dict.keys()[:pop_size * 0.6])
+                # Exchange Pareto members with the other islands
+                if migration is not None:
+                    objectives = migration(gen, objectives, estimated)
 
-            next_generation.extend(initialize_population(pop_size - len(next_generation), n_variables, max_depth))
-            gens_without_improvement = 0
-            continue
+                # Best individual of every complexity across the whole run, from full-data results only
+                if archive is not None:
+                    archive.update([entry for entry in objectives if entry[0] not in estimated])
+                objectives_dict = {ind: (mse, complexity) for ind, mse, complexity in sorted(objectives, key=lambda x: (x[1], x[2]))}
 
-        if verbose:
-            elitism_time = time.time()
-            print(f"Elitism Time: {elitism_time - selection_time:.6f}")
+                if verbose:
+                    if dag is not None:
+                        print(f"Shared Subtrees: {dag.unique_nodes}/{dag.total_nodes} nodes evaluated ({dag.dedup_ratio:.1%} saved)")
+                        if output_cache is not None:
+                            print(f"Reused Subtree Outputs: {dag.reused_nodes} nodes")
+                    print(f"Fitness Cache: {fitness_cache.hits} hits, {fitness_cache.misses} misses ({fitness_cache.hit_rate:.1%})")
 
-        # Generate offspring
-        while len(next_generation) < pop_size:
-            if random.random() < crossover_rate:
-                parent1, parent2 = random.sample(selected, 2)
-                offspring1, offspring2 = crossover(parent1, parent2)
-                next_generation.append(simplify_expression(offspring1))
-                next_generation.append(simplify_expression(offspring2))
-            else:
-                individual = random.choice(selected)
-                mutated = mutate(individual, max_depth, mutation_rate, n_variables)
-                next_generation.append(simplify_expression(mutated))
+                # Track the best individual, among full-data results
+                best_individual = best_of(objectives_dict, estimated)
+                best_fitness = objectives_dict[best_individual][0]
+                instruments.set('best_fitness', best_fitness)
+
+                if len(best_fitness_values) > 0 and best_fitness_values[-1] == best_fitness:
+                    gens_without_improvement += 1
+                else:
+                    gens_without_improvement = 0
+
+                best_fitness_values.append(best_fitness)
+                best_individuals.append(best_individual.clone(outputs=False))
+
+                print(f"Generation {gen+1}: Best Fitness = {best_fitness:.6f}")
+                if best_fitness < 0.0001:
+                    return best_individual, best_fitness, best_fitness_values
+
+                # Select individuals for the next generation
+                with instruments.stage('selection'):
+                    selected = multi_objective_selection(objectives_dict)
+                    if bloat_control == 'tarpeian':
+                        selected = tarpeian(selected, objectives_dict, tarpeian_rate)
+                    elif bloat_control == 'double_tournament':
+                        # Parents are then drawn uniformly from this mating pool
+                        selected = double_tournament(objectives_dict, len(selected), fitness_tournament_size, parsimony_size)
+
+                # Create next generation
+                next_generation = []
+
+                # Elitism
+                if elitism:
+                    with instruments.stage('elitism'):
+                        top_individuals = [
+                            simplified(pop.clone())
+                            for pop in sorted(objectives_dict.keys(), key=lambda ind: objectives_dict[ind])[:elitism_size]
+                        ]
+
+                        # Periodically fit the constants of the elites
+                        if constant_optimization_interval and (gen + 1) % constant_optimization_interval == 0:
+                            for ind in top_individuals:
+                                optimize_constants(ind, X_tune, y_tune, constant_optimization_budget)
+                        next_generation.extend(top_individuals)
+
+                if gens_without_improvement > max_no_improvement:
+                    # Restart from the best 60% and fresh random trees
+                    instruments.set('restart', True)
+                    ranked = list(objectives_dict.keys())
+                    if elitism:
+                        next_generation.extend(ranked[elitism_size:int(pop_size * 0.6)])
+                    else:
+                        next_generation.extend(ranked[:int(pop_size * 0.6)])
+
+                    with instruments.stage('refill'):
+                        next_generation.extend(initialize_population(pop_size - len(next_generation), n_variables, max_depth, generation_rng))
+                    gens_without_improvement = 0
+                    population = next_generation
+                    continue
+
+                # Generate offspring
+                with instruments.stage('variation'):
+                    if offspring_pool is not None:
+                        # Finished batches are evaluated into the fitness cache while the next ones are produced
+                        prefetch = None
+                        if pool is None and not racing and not streaming:
+                            prefetch = lambda batch: evaluate_population(batch, X, y, fitness_cache, output_cache)
+                        next_generation.extend(offspring_pool.generate(
+                            selected, pop_size - len(next_generation), random.getrandbits(64), gen,
+                            crossover_rate, mutation_rate, max_depth, n_variables, max_size, on_batch=prefetch,
+                        ))
+                    while len(next_generation) < pop_size:
+                        if random.random() < crossover_rate:
+                            parent1, parent2 = random.sample(selected, 2)
+                            offspring1, offspring2 = crossover(parent1, parent2, max_size, max_height)
+                            next_generation.append(simplified(offspring1))
+                            next_generation.append(simplified(offspring2))
+                        else:
+                            individual = random.choice(selected)
+                            mutated = mutate(individual, max_depth, mutation_rate, n_variables)
+                            next_generation.append(simplified(mutated))
+
+                # Trim the population
+                with instruments.stage('trim'):
+                    next_generation = trim_population(next_generation)
+                    if deduplicator is not None:
+                        next_generation, freed = deduplicator.deduplicate(next_generation)
+                        instruments.set('semantic_duplicates', freed)
+                        if verbose:
+                            print(f"Semantic Deduplication: {freed} slots freed ({deduplicator.freed} in total)")
+
+                    # Randomly trim the population further
+                    if random.random() < 0.2:
+                        if verbose:
+                            print("Trimming Population")
+                        next_generation = next_generation[:int(0.6 * pop_size)]
+
+                # Ensure the population size is maintained
+                with instruments.stage('refill'):
+                    next_generation.extend(initialize_population(pop_size - len(next_generation), n_variables, max_depth, generation_rng))
+
+                population = next_generation
+
+        # Final evaluation of the population
+        objectives, _, estimated = evaluate(population)
+        objectives_dict = {ind: (mse, complexity) for ind, mse, complexity in objectives}
+        objectives_dict = {ind: objectives_dict[ind] for ind in sorted(objectives_dict.keys(), key=lambda ind: objectives_dict[ind])}
+
+        best_individual = best_of(objectives_dict, estimated)
+        best_fitness = objectives_dict[best_individual][0]
+
+        best_fitness_values.append(best_fitness)
+        best_individuals.append(best_individual.clone(outputs=False))
+
+        # Final evaluation
+        best_fitness = min(best_fitness_values)
+        best_index = best_fitness_values.index(best_fitness)
+        best_individual = best_individuals[best_index]
 
         if verbose:
-            new_generation_time = time.time()
-            print(f"New Generation Time: {new_generation_time - elitism_time:.6f}")
+            print(f"\nBest Overall Fitness: {best_fitness:.6f}")
 
-        # Trim the population
-        next_generation = trim_population(next_generation)
+        return best_individual, best_fitness, best_fitness_values
+    finally:
         if verbose:
-            trimming_time = time.time()
-            print(f"Trimming Time: {trimming_time - new_generation_time:.6f}")
+            instruments.remove_sink(print_timings)
+        if pool is not None:
+            pool.close()
+        if offspring_pool is not None:
+            offspring_pool.close()
+        if writer is not None:
+            writer.close()
 
-        # Randomly trim the population further
-        if random.random() < 0.2:
-            if verbose:
-                print("Trimming Population")
-            next_generation = next_generation[:int(0.6 * pop_size)]
 
-        # Ensure the population size is maintained
-        while len(next_generation) < pop_size:
-            next_generation.append(generate_random_tree(max_depth, n_variables))
+def steady_state_programming(
+        X, y,
+        pop_size,
+        evaluations,
+        max_depth,
+        crossover_rate,
+        mutation_rate,
+        tournament_size=3,
+        n_jobs=-1,
+        chunk_size=16,
+        time_limit=None,
+        fitness_cache=None,
+        archive=None,
+        report_every=1000,
+        verbose=True,
+):
+    """Asynchronous steady-state GP on a concurrent.futures process pool.
 
-        if verbose:
-            random_generation_time = time.time()
-            print(f"Random Generation Time: {random_generation_time - trimming_time:.6f}")
+    Offspring are bred from tournaments over the current population and sent
+    to the workers in small chunks, keeping every worker busy: as soon as a
+    chunk finishes, its individuals are inserted into the population (each
+    replacing the loser of an inverse tournament, if it is better) and into
+    the ParetoArchive, and new offspring are submitted. The run stops after
+    the given number of offspring or time_limit seconds.
 
-        population = next_generation
-        save_current_population_as_file(population, f'population_{gen}.txt')
+    Returns the best individual, its fitness and the best fitness every
+    report_every offspring; pass an archive to keep the best individual of
+    every complexity as well.
+    """
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from .pool import _share, _attach, _evaluate_chunk
 
-    # Final evaluation of the population
-    objectives = Parallel(n_jobs=-1)(delayed(get_objectives)(ind, X, y) for ind in population)
-    objectives_dict = {ind: (mse, complexity) for ind, mse, complexity in objectives}
-    objectives_dict = {ind: objectives_dict[ind] for ind in sorted(objectives_dict.keys(), key=lambda ind: objectives_dict[ind])}
+    start_time = time.time()
+    if fitness_cache is None:
+        fitness_cache = FitnessCache()
+    if archive is None:
+        archive = ParetoArchive()
+    n_variables = len(X[0])
+    n_workers = os.cpu_count() if n_jobs is None or n_jobs < 0 else n_jobs
 
-    best_individual = list(objectives_dict.keys())[0]
-    best_fitness = objectives_dict[best_individual][0]
+    population = []  # (individual, mse, complexity)
+    best_fitness_values = []
+    processed = 0
+    evaluated = 0
+    generation_rng = np.random.default_rng(random.getrandbits(64))
+    initial = initialize_population(pop_size, n_variables, max_depth, generation_rng)
 
-    best_fitness_values.append(best_fitness)
-    best_individuals.append(best_individual)
+    def insert(individual, mse, complexity):
+        nonlocal processed
+        processed += 1
+        archive.insert(individual, mse, complexity)
+        if len(population) < pop_size:
+            population.append((individual, mse, complexity))
+        else:
+            loser = max(random.sample(range(len(population)), tournament_size), key=lambda i: population[i][1:])
+            if (mse, complexity) < population[loser][1:]:
+                population[loser] = (individual, mse, complexity)
+        if processed % report_every == 0:
+            best_fitness_values.append(archive.best()[1] if len(archive) else np.inf)
+            if verbose:
+                elapsed = time.time() - start_time
+                print(f"Offspring {processed}: Best Fitness = {best_fitness_values[-1]:.6f}, {evaluated / elapsed:.0f} evaluations/s")
+
+    def tournament():
+        return min(random.sample(population, min(tournament_size, len(population))), key=lambda entry: entry[1:])[0]
+
+    def breed():
+        """Next chunk of individuals: the initial population first, then offspring."""
+        if initial:
+            chunk = initial[:chunk_size]
+            del initial[:chunk_size]
+            return chunk
+        if len(population) < 2:
+            return initialize_population(chunk_size, n_variables, max_depth, generation_rng)
+        chunk = []
+        while len(chunk) < chunk_size:
+            if random.random() < crossover_rate:
+                offspring1, offspring2 = crossover(tournament(), tournament(), max_height=max_depth + 1)
+                chunk.append(simplify_expression(offspring1))
+                chunk.append(simplify_expression(offspring2))
+            else:
+                chunk.append(simplify_expression(mutate(tournament(), max_depth, mutation_rate, n_variables)))
+        return chunk
+
+    x_memory, X_shared = _share(X)
+    y_memory, y_shared = _share(y)
+    executor = ProcessPoolExecutor(
+        n_workers,
+        initializer=_attach,
+        initargs=(x_memory.name, X_shared.shape, y_memory.name, y_shared.shape),
+    )
+    pending = {}  # future -> (individuals, keys, complexities)
+    try:
+        while processed < evaluations and (time_limit is None or time.time() - start_time < time_limit):
+            # Keep two chunks per worker in flight; cached individuals are inserted right away
+            while len(pending) < 2 * n_workers and processed < evaluations:
+                chunk = breed()
+                keys, results = fitness_cache.lookup(chunk)
+                missing = []
+                for individual, key, result in zip(chunk, keys, results):
+                    if result is None:
+                        missing.append((individual, key))
+                    else:
+                        insert(individual, *result)
+                if missing:
+                    programs = [compile_tree(individual) for individual, _ in missing]
+                    future = executor.submit(_evaluate_chunk, pack_programs(programs))
+                    pending[future] = (missing, [len(program) for program in programs])
 
-    # Final evaluation
-    best_fitness = min(best_fitness_values)
-    best_index = best_fitness_values.index(best_fitness)
-    best_individual = best_individuals[best_index]
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                missing, complexities = pending.pop(future)
+                for (individual, key), mse, complexity in zip(missing, future.result().tolist(), complexities):
+                    fitness_cache.put(key, (mse, complexity))
+                    evaluated += 1
+                    insert(individual, mse, complexity)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for memory in (x_memory, y_memory):
+            memory.close()
+            memory.unlink()
 
+    elapsed = time.time() - start_time
+    best_individual, best_fitness, _ = archive.best()
+    best_fitness_values.append(best_fitness)
     if verbose:
+        print(f"Steady-State: {evaluated} evaluations in {elapsed:.2f}s ({evaluated / elapsed:.0f} evaluations/s), "
+              f"{processed - evaluated} fitness cache hits")
         print(f"\nBest Overall Fitness: {best_fitness:.6f}")
-
-    return best_individual, best_fitness, best_fitness_values
\ No newline at end of file
+    return best_individual, best_fitness, best_fitness_values
@@ -0,0 +1,49 @@
+from collections import deque
+
+import numpy as np
+
+from .node import Node, OperatorNode
+
+
+class OutputCache:
+    """Memory budget for prediction vectors kept on tree nodes between generations.
+
+    After an individual is evaluated, the shallowest operator nodes of its
+    tree (the largest subtrees) keep their output vector. Offspring cloned
+    from it share those vectors, and a local edit only invalidates the path
+    from the edited node to the root. Re-evaluation then recomputes that path
+    and reuses every untouched sibling subtree.
+    """
+
+    def __init__(self, X: np.ndarray, max_bytes: int = 128 * 2 ** 20):
+        self.X = X
+        self.max_bytes = max_bytes
+        self.nodes_per_tree = 0
+
+    def plan(self, pop_size: int):
+        """Split the budget evenly across the trees of a population of the given size."""
+        vector_bytes = max(1, self.X.shape[0] * np.dtype(np.float64).itemsize)
+        self.nodes_per_tree = int(self.max_bytes // (vector_bytes * max(1, pop_size)))
+
+    def lookup(self, node: Node) -> np.ndarray | None:
+        """Return the vector cached on node for this dataset, if any."""
+        output = node.output
+        if output is not None and output[0] is self:
+            return output[1]
+        return None
+
+    def store(self, node: Node, predictions: np.ndarray):
+        node.output = (self, predictions)
+
+    def targets(self, root: Node) -> list[Node]:
+        """Operator nodes of a tree that should keep their output, shallowest first."""
+        selected = []
+        queue = deque([root])
+        while queue and len(selected) < self.nodes_per_tree:
+            node = queue.popleft()
+            if isinstance(node, OperatorNode):
+                selected.append(node)
+                queue.append(node.left)
+                if node.right is not None:
+                    queue.append(node.right)
+        return selected
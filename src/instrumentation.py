@@ -0,0 +1,118 @@
+import cProfile
+import json
+import pstats
+import time
+from contextlib import contextmanager
+
+STAGES = ('evaluation', 'selection', 'elitism', 'variation', 'simplify', 'trim', 'refill')
+
+
+class ListSink:
+    """Keeps every record in memory."""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record: dict):
+        self.records.append(record)
+
+
+class JSONLSink:
+    """Appends every record as one JSON line to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a')
+
+    def __call__(self, record: dict):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class Instrumentation:
+    """Per-generation stage timings and counters, sent to pluggable sinks.
+
+    A sink is any callable taking the record of one generation: ListSink,
+    JSONLSink or a plain function. Stage timings are exclusive, so time spent
+    in a nested stage (simplify inside variation) is only counted once. With
+    profile_every, every profile_every-th generation also runs under cProfile
+    and its record lists the top functions by cumulative time.
+    """
+
+    def __init__(self, *sinks, profile_every: int = 0, profile_top: int = 20):
+        self.sinks = list(sinks)
+        self.profile_every = profile_every
+        self.profile_top = profile_top
+        self.record = None
+        self._stages = []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    @contextmanager
+    def generation(self, gen: int):
+        """Collect one generation's record and send it to the sinks when the block exits, however it exits."""
+        self.record = {'generation': gen, 'timings': dict.fromkeys(STAGES, 0.0)}
+        profiler = None
+        if self.profile_every and gen % self.profile_every == 0:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield self.record
+        finally:
+            self.record['total'] = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self.record['profile'] = self._top_functions(profiler)
+            record, self.record = self.record, None
+            for sink in self.sinks:
+                sink(record)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage of the current generation; does nothing outside a generation."""
+        if self.record is None:
+            yield
+            return
+        self._stages.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stages.pop()
+            timings = self.record['timings']
+            timings[name] = timings.get(name, 0.0) + elapsed
+            if self._stages:
+                timings[self._stages[-1]] -= elapsed
+
+    def count(self, name: str, value=1):
+        """Add value to a counter of the current generation."""
+        if self.record is not None:
+            self.record[name] = self.record.get(name, 0) + value
+
+    def set(self, name: str, value):
+        """Set a value in the current generation's record."""
+        if self.record is not None:
+            self.record[name] = value
+
+    def _top_functions(self, profiler: cProfile.Profile) -> list[dict]:
+        stats = pstats.Stats(profiler).stats
+        entries = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.profile_top]
+        return [
+            {'function': f'{filename}:{line}({name})', 'calls': calls, 'time': total_time, 'cumulative': cumulative_time}
+            for (filename, line, name), (_, calls, total_time, cumulative_time, _) in entries
+        ]
+
+
+def print_timings(record: dict):
+    """Sink printing the stage timings of a generation, as verbose runs do."""
+    for stage, seconds in record['timings'].items():
+        print(f"{stage.title()} Time: {seconds:.6f}")
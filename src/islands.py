@@ -0,0 +1,186 @@
+import multiprocessing
+import queue
+import random
+
+import numpy as np
+
+from .node import Node
+from .encoding import encode_population, decode_population
+from .selection import pareto_front
+from .pool import _share, _open
+from .gp import genetic_programming
+
+TOPOLOGIES = ('ring', 'random')
+# genetic_programming options that every island would share: the same
+# checkpoint file, or a copy of the archive or instrumentation in each process
+ISLAND_EXCLUSIVE_OPTIONS = ('checkpoint_file', 'archive', 'instrumentation')
+
+
+def migration_targets(n_islands: int, gen: int, topology: str = 'ring', seed: int = 0) -> list[int]:
+    """Destination island of every island for one migration.
+
+    A random topology is a fresh random cycle over the islands, the same in
+    every process for a given seed and generation, so that every island
+    sends and receives exactly one batch of migrants.
+    """
+    if topology == 'ring':
+        return [(i + 1) % n_islands for i in range(n_islands)]
+    if topology == 'random':
+        order = np.random.default_rng((seed, gen)).permutation(n_islands)
+        targets = [0] * n_islands
+        for position, island in enumerate(order):
+            targets[island] = int(order[(position + 1) % n_islands])
+        return targets
+    raise ValueError(f"Unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+
+
+class Migration:
+    """Migration hook of one island, called by genetic_programming after each evaluation.
+
+    Every interval generations the island sends up to migrants members of
+    its Pareto front, encoded together with their objectives, to its target
+    island. It then waits for the batch from its source island and puts the
+    immigrants in place of its worst individuals. Individuals in estimated,
+    whose MSE is a racing estimate, are not sent. A source island that has
+    already finished is skipped, and nothing is sent to a finished target.
+    """
+
+    def __init__(self, island: int, inboxes: list, active, interval: int = 5, migrants: int = 3, topology: str = 'ring', seed: int = 0):
+        self.island = island
+        self.inboxes = inboxes
+        self.active = active
+        self.interval = interval
+        self.migrants = migrants
+        self.topology = topology
+        self.seed = seed
+        self.pending = {}  # generation -> batch received ahead of time
+        self.received = 0
+
+    def __call__(self, gen: int, objectives: list[tuple[Node, float, int]], estimated=frozenset()) -> list[tuple[Node, float, int]]:
+        if (gen + 1) % self.interval != 0:
+            return objectives
+        n_islands = len(self.inboxes)
+        targets = migration_targets(n_islands, gen, self.topology, self.seed)
+        source = targets.index(self.island)
+
+        # Emigrants carry full-data fitness only, never a racing estimate
+        population = [ind for ind, _, _ in objectives if ind not in estimated]
+        fitness = {ind: (mse, complexity) for ind, mse, complexity in objectives}
+        front = pareto_front(population, [fitness[ind] for ind in population])
+        emigrants = sorted(front, key=lambda ind: fitness[ind])[:self.migrants]
+        target = targets[self.island]
+        if self.active[target]:
+            # A finished island no longer reads its inbox
+            self.inboxes[target].put((
+                gen,
+                encode_population(emigrants),
+                [fitness[ind] for ind in emigrants],
+            ))
+
+        batch = self._receive(gen, source)
+        if batch is None:
+            return objectives
+        packed, immigrant_fitness = batch
+        immigrants = [(ind, mse, complexity) for ind, (mse, complexity) in zip(decode_population(packed), immigrant_fitness)]
+        self.received += len(immigrants)
+
+        # Immigrants replace the worst individuals
+        ranked = sorted(objectives, key=lambda x: (x[1], x[2]))
+        return ranked[:len(ranked) - len(immigrants)] + immigrants
+
+    def _receive(self, gen: int, source: int):
+        """Wait for the batch sent at generation gen, unless its sender has finished."""
+        inbox = self.inboxes[self.island]
+        while gen not in self.pending:
+            try:
+                sent_gen, packed, fitness = inbox.get(timeout=0.1)
+                self.pending[sent_gen] = (packed, fitness)
+            except queue.Empty:
+                if not self.active[source]:
+                    return None
+        return self.pending.pop(gen)
+
+
+def _island(island, x_name, x_shape, y_name, y_shape, inboxes, active, results, seed, migration_options, gp_options):
+    """Process entry point: run the whole GP loop on one island."""
+    try:
+        random.seed(seed + island)
+        np.random.seed(seed + island)
+        X = _open(x_name, x_shape)
+        y = _open(y_name, y_shape)
+        migration = Migration(island, inboxes, active, seed=seed, **migration_options)
+        best_individual, best_fitness, best_fitness_values = genetic_programming(X, y, migration=migration, **gp_options)
+        results.put((island, encode_population([best_individual]), best_fitness, best_fitness_values))
+    finally:
+        active[island] = False
+        # Batches still buffered for islands that stopped reading must not keep this process alive
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+
+
+def island_model(
+        X: np.ndarray,
+        y: np.ndarray,
+        n_islands: int = 4,
+        migration_interval: int = 5,
+        migrants: int = 3,
+        topology: str = 'ring',
+        seed: int = 0,
+        **gp_options,
+) -> tuple[Node, float, list[list[float]]]:
+    """Run genetic_programming on n_islands sub-populations, one process each.
+
+    Each island runs the full generation loop (evaluation, selection,
+    variation, simplification, trimming) with its own seed, and exchanges
+    Pareto members with the others every migration_interval generations
+    over a ring or random topology. X and y are shared through shared memory.
+    Keyword arguments are passed to genetic_programming; pop_size is the size
+    of each island; checkpoint_file, archive and instrumentation are not
+    supported, since the islands would all write to the same file or to
+    copies the caller never sees. Returns the best individual over all
+    islands, its fitness and the best fitness history of every island.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+    shared = [name for name in ISLAND_EXCLUSIVE_OPTIONS if gp_options.get(name) is not None]
+    if shared:
+        raise ValueError(f"island_model does not support {', '.join(shared)}: every island would share it")
+    gp_options['n_jobs'] = 1  # The islands already use every core
+
+    x_memory, X = _share(X)
+    y_memory, y = _share(y)
+    inboxes = [multiprocessing.Queue() for _ in range(n_islands)]
+    active = multiprocessing.Array('b', [True] * n_islands)
+    results = multiprocessing.Queue()
+    migration_options = {'interval': migration_interval, 'migrants': migrants, 'topology': topology}
+    processes = [
+        multiprocessing.Process(
+            target=_island,
+            args=(i, x_memory.name, X.shape, y_memory.name, y.shape, inboxes, active, results, seed, migration_options, gp_options),
+        )
+        for i in range(n_islands)
+    ]
+    try:
+        for process in processes:
+            process.start()
+
+        outcomes = []
+        while len(outcomes) < n_islands:
+            try:
+                outcomes.append(results.get(timeout=1.0))
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    raise RuntimeError(f"{n_islands - len(outcomes)} island(s) exited without a result")
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for memory in (x_memory, y_memory):
+            memory.close()
+            memory.unlink()
+
+    outcomes.sort(key=lambda outcome: outcome[0])
+    best = min(outcomes, key=lambda outcome: outcome[2])
+    return decode_population(best[1])[0], best[2], [outcome[3] for outcome in outcomes]
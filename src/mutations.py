@@ -1,32 +1,30 @@
 import random
 
-from node import *
-from utils import generate_random_tree, find_parent, replace_child
+from .node import Node, OperatorNode, OperandNode, random_node
+from .utils import generate_random_tree, find_parent, replace_child
+
+BINARY_OPCODES = sorted(OperatorNode.BINARY_OPCODES)
+UNARY_OPCODES = [op for op in range(len(OperatorNode.SYMBOLS)) if op not in OperatorNode.BINARY_OPCODES]
 
 def mutate(individual: Node, max_depth: int, mutation_rate: float, n_variables: int) -> Node:
     """Mutate an individual with a given mutation rate."""
     if random.random() >= mutation_rate:
-        return individual  # No mutation occurs
+        # No mutation occurs; still a copy, since offspring are simplified in place
+        return individual.clone()
 
     # Clone the individual to avoid modifying the original
     individual = individual.clone()
 
-    # Get all nodes in the tree
-    nodes = get_all_nodes(individual)
-    if not nodes:
-        raise ValueError("Cannot mutate: The tree has no nodes.")
-
     # Select a random node for mutation
-    mutate_node = random.choice(nodes)
-    while mutate_node is None:
-        mutate_node = random.choice(nodes)
+    mutate_node = random_node(individual)
 
     # Apply mutation strategies
     mutation_type = random.choice(["shrink", "subtree_replacement", "hoist", "tweak"])
     if mutation_type == "shrink":
         return apply_shrink_mutation(individual, mutate_node, n_variables)
     elif mutation_type == "subtree_replacement" and max_depth - mutate_node.depth > 1:
-        new_subtree = generate_random_tree(max_depth - mutate_node.depth, n_variables, mutate_node.depth)
+        # Grow the new subtree from the node's depth, so its leaves stay within max_depth
+        new_subtree = generate_random_tree(max_depth, n_variables, mutate_node.depth)
         replace(individual, mutate_node, new_subtree)
     elif mutation_type == "hoist":
         return apply_hoist_mutation(individual, mutate_node)
@@ -42,8 +40,7 @@ def apply_shrink_mutation(individual: Node, mutate_node: Node, n_variables: int)
 
     # Generate a terminal node (variable or constant)
     terminal = OperandNode(
-        value=random.choice([random.uniform(-10, 10), f"x_{random.randint(0, n_variables - 1)}"]),
-        depth=mutate_node.depth  # Preserve depth for consistency
+        value=random.choice([random.uniform(-10, 10), f"x_{random.randint(0, n_variables - 1)}"])
     )
 
     # Replace the mutate_node with the terminal node
@@ -88,6 +85,7 @@ def apply_hoist_mutation(individual: Node, mutate_node: Node) -> Node:
     else:
         # If the mutate_node is the root, replace the entire tree
         individual = hoisted_subtree
+        individual.parent = None
 
     return individual
 
@@ -100,23 +98,21 @@ def tweak(node: Node, n_variables: int):
 
 def mutate_operator(node: OperatorNode):
     """Mutate an operator node by changing its operator."""
-    if node.operator_symbol not in OperatorNode.BINARY_OPERATORS:
+    if node.opcode not in OperatorNode.BINARY_OPCODES:
         # Unary operator
-        available_operators = [op for op in OperatorNode.OPERATORS.keys() if op not in OperatorNode.BINARY_OPERATORS]
-        available_operators.remove(node.operator_symbol)
+        available_operators = [op for op in UNARY_OPCODES if op != node.opcode]
     else:
         # Binary operator
-        available_operators = [op for op in OperatorNode.BINARY_OPERATORS]
-        available_operators.remove(node.operator_symbol)
+        available_operators = [op for op in BINARY_OPCODES if op != node.opcode]
 
-    node.operator_symbol = random.choice(available_operators)
-    node.function = OperatorNode.OPERATORS[node.operator_symbol]
+    node.opcode = random.choice(available_operators)
+    node.invalidate()
 
 def mutate_operand(node: OperandNode, n_variables: int):
     """Mutate an operand node by changing its value or variable index."""
     if isinstance(node.value, float):
         # Mutate constant value slightly
         node.value += random.uniform(-1, 1)
-    elif isinstance(node.value, str) and node.value.startswith('x_'):
+    elif node.is_variable:
         # Change the variable index
         node.value = f"x_{random.randint(0, n_variables - 1)}"
@@ -1,19 +1,74 @@
+import hashlib
 import operator
+import random
 import numpy as np
 
+
+def protected_div(a, b):
+    """Protected division, returning 1 wherever the divisor is zero."""
+    if np.ndim(a) == 0 and np.ndim(b) == 0:
+        return a / b if b != 0 else 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b != 0, np.divide(a, b), 1.0)
+
+
 class Node:
+    # Every node knows its parent and caches the size and height of its subtree.
+    # output optionally holds an (owner, predictions) pair from a previous evaluation.
+    __slots__ = ('parent', 'size', 'height', 'output')
+
     def evaluate(self, x):
-        """Evaluate the node with the given input."""
+        """Evaluate the node on a single sample or on a whole (n_samples, n_vars) matrix."""
         raise NotImplementedError("Must implement evaluate method")
 
     def __str__(self):
         """Return the string representation of the node."""
         raise NotImplementedError("Must implement __str__ method")
 
-    def clone(self):
-        """Clone the node."""
+    def clone(self, outputs: bool = True):
+        """Clone the node; with outputs=False the clone does not share the cached output vectors."""
         raise NotImplementedError("Must implement clone method")
 
+    def invalidate(self):
+        """Drop the cached outputs of this node and of every ancestor after a local edit."""
+        node = self
+        while node is not None:
+            node.output = None
+            node = node.parent
+
+    def root(self):
+        """Return the root of the tree containing this node."""
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
+    @property
+    def depth(self) -> int:
+        """Distance from the root, derived from the parent links so it stays right after any edit."""
+        depth = 0
+        node = self.parent
+        while node is not None:
+            depth += 1
+            node = node.parent
+        return depth
+
+    def get_depth(self) -> int:
+        """Number of levels of the subtree rooted at this node, a leaf counting as one."""
+        return self.height
+
+    def node_at(self, index: int) -> 'Node':
+        """Return the node at a given pre-order index, walking down with the cached sizes."""
+        node = self
+        while index:
+            index -= 1
+            if index < node.left.size:
+                node = node.left
+            else:
+                index -= node.left.size
+                node = node.right
+        return node
+
 
 class OperatorNode(Node):
     # Adding all NumPy mathematical functions to OPERATORS
@@ -21,7 +76,7 @@ class OperatorNode(Node):
         '+': operator.add,
         '-': operator.sub,
         '*': operator.mul,
-        '/': lambda a, b: a / b if b != 0 else 1,  # Protected division
+        '/': protected_div,
         'sin': lambda x: np.sin(np.clip(x, -1e10, 1e10)),  # Clamp input to avoid invalid values
         'cos': lambda x: np.cos(np.clip(x, -1e10, 1e10)),  # Clamp input to avoid invalid values
         'tan': lambda x: np.tan(np.clip(x, -1e10, 1e10)),  # Clamp input to avoid invalid values
@@ -33,21 +88,89 @@ class OperatorNode(Node):
 
     BINARY_OPERATORS = {'+', '-', '*', '/'}
 
-    def __init__(self, operator_symbol, left=None, right=None, depth=0):
-        self.operator_symbol = operator_symbol
+    # Integer opcodes: nodes store an index into these tables instead of a symbol and a function
+    SYMBOLS = tuple(OPERATORS)
+    FUNCTIONS = tuple(OPERATORS.values())
+    OPCODES = {symbol: opcode for opcode, symbol in enumerate(SYMBOLS)}
+    BINARY_OPCODES = frozenset(map(OPCODES.__getitem__, BINARY_OPERATORS))
+
+    __slots__ = ('opcode', '_left', '_right')
+
+    def __init__(self, operator_symbol, left=None, right=None):
+        self.opcode = self.OPCODES[operator_symbol]
+        self.parent = None
+        self.output = None
+        self._left = self._right = None
+        self.size = self.height = 1
         self.left = left
         self.right = right
-        self.function = self.OPERATORS.get(operator_symbol)
-        self.depth = depth
+
+    @property
+    def left(self):
+        return self._left
+
+    @left.setter
+    def left(self, node):
+        self._replace_slot('_left', node)
+
+    @property
+    def right(self):
+        return self._right
+
+    @right.setter
+    def right(self, node):
+        self._replace_slot('_right', node)
+
+    def _replace_slot(self, slot, node):
+        """Attach node as a child, relinking parents and refreshing the cached sizes upwards."""
+        old = getattr(self, slot)
+        if node is old:
+            return
+        if old is not None and old.parent is self:
+            old.parent = None
+        setattr(self, slot, node)
+        if node is not None:
+            node.parent = self
+        self.refresh()
+        self.invalidate()
+
+    def refresh(self):
+        """Recompute size and height here and in the ancestors, stopping once nothing changes."""
+        node = self
+        while node is not None:
+            left, right = node._left, node._right
+            size = 1 + (left.size if left is not None else 0) + (right.size if right is not None else 0)
+            height = 1 + max(left.height if left is not None else 0, right.height if right is not None else 0)
+            if size == node.size and height == node.height and node is not self:
+                break
+            node.size = size
+            node.height = height
+            node = node.parent
+
+    @property
+    def operator_symbol(self):
+        return self.SYMBOLS[self.opcode]
+
+    @operator_symbol.setter
+    def operator_symbol(self, symbol):
+        self.opcode = self.OPCODES[symbol]
+
+    @property
+    def function(self):
+        return self.FUNCTIONS[self.opcode]
+
+    @property
+    def is_binary(self):
+        return self.opcode in self.BINARY_OPCODES
 
     def evaluate(self, x):
-        """Evaluate the operator node with the given input."""
+        """Evaluate the operator node with the given input (a sample or a data matrix)."""
         left_val = self.left.evaluate(x)
-        if self.operator_symbol not in self.BINARY_OPERATORS:
-            result = self.function(left_val)
+        if self.opcode not in self.BINARY_OPCODES:
+            result = self.FUNCTIONS[self.opcode](left_val)
         else:
             right_val = self.right.evaluate(x)
-            result = self.function(left_val, right_val)
+            result = self.FUNCTIONS[self.opcode](left_val, right_val)
         return result
 
     def __str__(self):
@@ -56,52 +179,109 @@ class OperatorNode(Node):
             return f"{self.operator_symbol}({self.left})"
         return f"({self.left} {self.operator_symbol} {self.right})"
 
-    def clone(self):
-        """Clone the operator node."""
-        return OperatorNode(
-            self.operator_symbol,
-            self.left.clone() if self.left else None,
-            self.right.clone() if self.right else None,
-            self.depth,
-        )
+    def clone(self, outputs: bool = True):
+        """Clone the operator node.
 
-    def get_depth(self):
-        """Get the depth of the operator node."""
-        left_depth = self.left.get_depth() if self.left else 0
-        right_depth = self.right.get_depth() if self.right else 0
-        return max(left_depth, right_depth)
+        Cached vectors are read-only and shared between clones. Clones kept
+        for the whole run (archive, best individual history) pass
+        outputs=False, so that they do not pin vectors outside the budget of
+        the OutputCache.
+        """
+        node = OperatorNode.__new__(OperatorNode)
+        node.opcode = self.opcode
+        node.parent = None
+        node.output = self.output if outputs else None
+        node._left = left = self._left.clone(outputs) if self._left else None
+        node._right = right = self._right.clone(outputs) if self._right else None
+        if left is not None:
+            left.parent = node
+        if right is not None:
+            right.parent = node
+        node.size = self.size
+        node.height = self.height
+        return node
 
 
 class OperandNode(Node):
-    def __init__(self, value, depth=0):
+    __slots__ = ('_value', 'index')
+
+    def __init__(self, value):
+        self.parent = None
         self.value = value  # Can be a constant or a variable
-        self.depth = depth
+        self.size = self.height = 1
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        # Variables keep their column index so evaluation never parses the name
+        self._value = value
+        self.index = int(value.lstrip('x_')) if isinstance(value, str) else -1
+        self.invalidate()
+
+    @property
+    def is_variable(self):
+        return self.index >= 0
 
     def evaluate(self, x):
-        """Evaluate the operand node with the given input."""
-        if isinstance(self.value, str):
-            result = x[int(self.value.lstrip('x_'))]
+        """Evaluate the operand node with the given input.
+
+        Variables return a column view when x is a (n_samples, n_vars) matrix,
+        constants are returned as scalars and broadcast by the operators.
+        """
+        if self.index >= 0:
+            result = x[:, self.index] if np.ndim(x) == 2 else x[self.index]
         else:
-            result = self.value
+            result = self._value
         return result
 
     def __str__(self):
         """Return the string representation of the operand node."""
-        return str(self.value)
-
-    def clone(self):
-        """Clone the operand node."""
-        return OperandNode(self.value, self.depth)
+        return str(self._value)
 
-    def get_depth(self):
-        """Get the depth of the operand node."""
-        return self.depth + 1
+    def clone(self, outputs: bool = True):
+        """Clone the operand node; operands never cache an output."""
+        node = OperandNode.__new__(OperandNode)
+        node._value = self._value
+        node.index = self.index
+        node.parent = None
+        node.output = None
+        node.size = node.height = 1
+        return node
 
 
 def get_all_nodes(node):
-    """Get all nodes in the tree."""
-    nodes = [node]
-    if isinstance(node, OperatorNode):
-        nodes += get_all_nodes(node.left)
-        nodes += get_all_nodes(node.right)
-    return nodes
\ No newline at end of file
+    """Get all nodes in the tree, in pre-order."""
+    nodes = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        nodes.append(current)
+        if isinstance(current, OperatorNode):
+            if current.right is not None:
+                stack.append(current.right)
+            stack.append(current.left)
+    return nodes
+
+def random_node(root: Node, rng=random) -> Node:
+    """Pick a node uniformly at random in O(depth), using the cached subtree sizes."""
+    return root.node_at(rng.randrange(root.size))
+
+def structural_key(node) -> bytes:
+    """Canonical structural hash of a tree, identical for trees that print the same."""
+    tokens = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, OperatorNode):
+            tokens.append(current.operator_symbol)
+            if current.opcode in OperatorNode.BINARY_OPCODES:
+                stack.append(current.right)
+            stack.append(current.left)
+        elif current.index >= 0:
+            tokens.append(current.value)
+        else:
+            tokens.append(repr(float(current.value)))
+    return hashlib.blake2b(' '.join(tokens).encode(), digest_size=16).digest()
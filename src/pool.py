@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from .node import Node
+from .compiler import compile_tree, pack_programs, unpack_programs, run_program
+from .fitness import FitnessCache, mean_squared_error
+
+# Worker-side views of the shared dataset, set by _attach
+_worker_memory = []
+_worker_X = None
+_worker_y = None
+
+
+def _share(array: np.ndarray) -> tuple[SharedMemory, np.ndarray]:
+    """Copy an array into a new shared memory block."""
+    array = np.ascontiguousarray(array, dtype=np.float64)
+    memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=np.float64, buffer=memory.buf)
+    shared[...] = array
+    return memory, shared
+
+def _open(name: str, shape: tuple) -> np.ndarray:
+    """Attach to a shared memory block owned by the parent process."""
+    memory = SharedMemory(name=name)
+    _worker_memory.append(memory)
+    return np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+
+def _attach(x_name, x_shape, y_name, y_shape):
+    """Pool initializer: map X and y from shared memory once per worker."""
+    global _worker_X, _worker_y
+    _worker_X = _open(x_name, x_shape)
+    _worker_y = _open(y_name, y_shape)
+
+def _evaluate_chunk(packed: tuple[np.ndarray, ...]) -> np.ndarray:
+    """Evaluate a packed chunk of programs, returning their MSEs as a float64 array."""
+    programs = unpack_programs(packed)
+    return np.array([mean_squared_error(run_program(program, _worker_X), _worker_y) for program in programs])
+
+
+class EvaluationPool:
+    """Long-lived worker pool evaluating populations against X/y held in shared memory.
+
+    The pool is created once per run. Populations are compiled, split into
+    chunks of roughly equal node count and sent as packed postfix programs;
+    only MSE arrays are sent back.
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, n_jobs: int = -1, chunks_per_worker: int = 4):
+        self.n_workers = os.cpu_count() if n_jobs is None or n_jobs < 0 else n_jobs
+        self.chunks_per_worker = chunks_per_worker
+        self._x_memory, X = _share(X)
+        self._y_memory, y = _share(y)
+        self._pool = multiprocessing.Pool(
+            self.n_workers,
+            initializer=_attach,
+            initargs=(self._x_memory.name, X.shape, self._y_memory.name, y.shape),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        if self._pool is None:
+            return
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+        for memory in (self._x_memory, self._y_memory):
+            memory.close()
+            memory.unlink()
+
+    def _chunks(self, programs: list) -> list[list]:
+        """Split programs into contiguous chunks of roughly equal total node count."""
+        total_nodes = sum(len(program) for program in programs)
+        target = max(1, total_nodes // (self.n_workers * self.chunks_per_worker))
+        chunks, chunk, chunk_nodes = [], [], 0
+        for program in programs:
+            chunk.append(program)
+            chunk_nodes += len(program)
+            if chunk_nodes >= target:
+                chunks.append(chunk)
+                chunk, chunk_nodes = [], 0
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def map_mse(self, population: list[Node]) -> tuple[list[float], list[int]]:
+        """Return the MSE and node count of every individual."""
+        programs = [compile_tree(ind) for ind in population]
+        chunks = self._chunks(programs)
+        results = self._pool.map(_evaluate_chunk, [pack_programs(chunk) for chunk in chunks])
+        mses = np.concatenate(results).tolist() if results else []
+        return mses, [len(program) for program in programs]
+
+    def evaluate(self, population: list[Node], fitness_cache: FitnessCache | None = None) -> list[tuple[Node, float, int]]:
+        """Calculate (individual, mse, complexity) for a population, skipping cached individuals."""
+        if fitness_cache is None:
+            mses, sizes = self.map_mse(population)
+            return list(zip(population, mses, sizes))
+
+        keys, results = fitness_cache.lookup(population)
+        missing = [i for i, result in enumerate(results) if result is None]
+        mses, sizes = self.map_mse([population[i] for i in missing])
+        for i, mse, complexity in zip(missing, mses, sizes):
+            results[i] = (mse, complexity)
+            fitness_cache.put(keys[i], results[i])
+        return [(ind, mse, complexity) for ind, (mse, complexity) in zip(population, results)]
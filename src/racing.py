@@ -0,0 +1,133 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from .node import Node, structural_key
+from .dag import SubexpressionDAG
+from .fitness import FitnessCache, mean_squared_error
+
+
+def z_score(confidence: float) -> float:
+    """Two-sided normal quantile for a confidence level such as 0.95."""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+def squared_error_stats(predictions: np.ndarray, y: np.ndarray) -> tuple[float, float]:
+    """Mean and standard error of the squared errors of clipped predictions."""
+    predictions_clipped = np.clip(predictions, -1e10, 1e10)
+    with np.errstate(over='ignore', invalid='ignore'):
+        errors = (y - predictions_clipped) ** 2
+        mean = float(np.mean(errors))
+        stderr = float(np.std(errors) / np.sqrt(len(errors)))
+    if np.isnan(mean) or np.isnan(stderr):
+        return np.inf, 0.0
+    return mean, stderr
+
+def dominated_candidates(lower: np.ndarray, upper: np.ndarray, complexity: np.ndarray) -> np.ndarray:
+    """Mask of candidates that another candidate, no more complex, clearly beats.
+
+    Candidate i is dropped when some j != i with complexity[j] <= complexity[i]
+    has an upper confidence bound below the lower bound of i.
+    """
+    dropped = np.zeros(len(lower), dtype=bool)
+    order = np.argsort(complexity, kind='stable')
+    best_before = np.inf
+    start = 0
+    while start < len(order):
+        end = start
+        while end < len(order) and complexity[order[end]] == complexity[order[start]]:
+            end += 1
+        group = order[start:end]
+        group_upper = upper[group]
+        # The best competitor of each member, excluding itself, within the group and before it
+        two_best = np.partition(group_upper, 1)[:2] if len(group) > 1 else np.array([group_upper[0], np.inf])
+        for i, u in zip(group, group_upper):
+            rival = two_best[1] if u == two_best[0] else two_best[0]
+            dropped[i] = min(best_before, rival) < lower[i]
+        best_before = min(best_before, two_best[0])
+        start = end
+    return dropped
+
+
+def race_population(
+        population: list[Node],
+        X: np.ndarray,
+        y: np.ndarray,
+        fitness_cache: FitnessCache | None = None,
+        output_cache=None,
+        subsample_size: int = 256,
+        confidence: float = 0.99,
+        growth: int = 2,
+        rng: np.random.Generator | None = None,
+        probe=None,
+) -> tuple[list[tuple[Node, float, int]], np.ndarray, SubexpressionDAG, int]:
+    """Evaluate a population with successive halving on growing random subsamples.
+
+    Every candidate is first scored on subsample_size random rows. Candidates
+    that are clearly dominated (worse MSE at the given confidence than a
+    candidate of no greater complexity) keep their subsample estimate and
+    are dropped; the survivors are scored again on a subsample growth times
+    larger, until only the remaining ones are evaluated on the full data.
+    Only full-data results go to fitness_cache.
+
+    With a SemanticDeduplicator as probe, the first round runs on its probe
+    rows and reuses the statistics it already computed for known trees.
+
+    Returns the (individual, mse, complexity) tuples, a boolean mask of the
+    entries whose MSE is a subsample estimate rather than a full-data
+    result, the DAG of the full evaluation and the number of full
+    evaluations saved.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    z = z_score(confidence)
+    n_samples = len(X)
+
+    results = [None] * len(population)
+    if fitness_cache is not None:
+        keys, results = fitness_cache.lookup(population)
+    elif probe is not None:
+        keys = [structural_key(ind) for ind in population]
+    candidates = [i for i, result in enumerate(results) if result is None]
+    estimated = np.zeros(len(population), dtype=bool)
+    complexity = np.array([population[i].size for i in candidates])
+
+    # Nested subsamples: each round extends the rows of the previous one
+    rows = rng.permutation(n_samples)
+    size = subsample_size
+    known_stats = {}
+    if probe is not None:
+        rows = np.concatenate((probe.rows, rng.permutation(np.setdiff1d(np.arange(n_samples), probe.rows))))
+        size = len(probe.rows)
+        known_stats = probe.stats
+    survivors = np.arange(len(candidates))
+    while size < n_samples and len(survivors) > 1:
+        sample = rows[:size]
+        stats = np.empty((len(survivors), 2))
+        pending = []
+        for k, i in enumerate(survivors):
+            known = known_stats.get(keys[candidates[i]]) if known_stats else None
+            if known is None:
+                pending.append(k)
+            else:
+                stats[k] = known
+        if pending:
+            dag = SubexpressionDAG([population[candidates[survivors[k]]] for k in pending])
+            stats[pending] = dag.evaluate(X[sample], lambda predictions: squared_error_stats(predictions, y[sample]))
+        known_stats = {}
+        mean, stderr = stats[:, 0], stats[:, 1]
+        dropped = dominated_candidates(mean - z * stderr, mean + z * stderr, complexity[survivors])
+        for i, estimate in zip(survivors[dropped], mean[dropped]):
+            results[candidates[i]] = (float(estimate), int(complexity[i]))
+            estimated[candidates[i]] = True
+        survivors = survivors[~dropped]
+        size *= growth
+
+    dag = SubexpressionDAG([population[candidates[i]] for i in survivors], output_cache)
+    mses = dag.evaluate(X, lambda predictions: mean_squared_error(predictions, y))
+    for i, mse, n_nodes in zip(survivors, mses, dag.sizes):
+        index = candidates[i]
+        results[index] = (mse, n_nodes)
+        if fitness_cache is not None:
+            fitness_cache.put(keys[index], results[index])
+
+    saved = len(candidates) - len(survivors)
+    return [(ind, mse, complexity) for ind, (mse, complexity) in zip(population, results)], estimated, dag, saved
@@ -1,60 +1,152 @@
-from src.node import Node
+import random
+from bisect import bisect_left
+
+import numpy as np
+
+from .node import Node
+
+BLOAT_CONTROLS = (None, 'tarpeian', 'double_tournament')
 
 
 def dominates(ind1: tuple[float, float], ind2: tuple[float, float]) -> bool:
     """Check if one individual dominates another."""
     return (ind1[0] <= ind2[0] and ind1[1] <= ind2[1]) and (ind1[0] < ind2[0] or ind1[1] < ind2[1])
 
+def _as_array(objectives) -> np.ndarray:
+    """Objectives as an (n, 2) float array, with NaN treated as the worst possible value."""
+    values = np.array(objectives, dtype=float).reshape(-1, 2)
+    values[np.isnan(values)] = np.inf
+    return values
+
+def non_dominated_sort(objectives) -> np.ndarray:
+    """Assign the Pareto front rank (0 is the best front) of every point of a two-objective problem.
+
+    Points are swept in lexicographic order. Each front keeps its last point,
+    and those points are sorted by (second, first) objective across fronts, so
+    the first front that does not dominate the current point is found with a
+    binary search: O(n log n) overall.
+    """
+    values = _as_array(objectives)
+    ranks = np.empty(len(values), dtype=np.int64)
+    order = np.lexsort((values[:, 1], values[:, 0]))
+    fronts_last = []
+    for i in order.tolist():
+        key = (values[i, 1], values[i, 0])
+        rank = bisect_left(fronts_last, key)
+        if rank == len(fronts_last):
+            fronts_last.append(key)
+        else:
+            fronts_last[rank] = key
+        ranks[i] = rank
+    return ranks
+
 def pareto_front(population: list[Node], objectives: list[tuple[float, int]]) -> list[Node]:
     """Find the Pareto front of the population."""
-    front = []
-    for i, obj1 in enumerate(objectives):
-        dominated = False
-        for j, obj2 in enumerate(objectives):
-            if i != j and dominates(obj2, obj1):
-                dominated = True
-                break
-        if not dominated:
-            front.append(population[i])
-    return front
+    ranks = non_dominated_sort(objectives)
+    return [population[i] for i in np.flatnonzero(ranks == 0)]
+
+def update_front(front: list[tuple[int, float, Node]], complexity: int, mse: float, individual: Node) -> bool:
+    """Insert a point into a front unless a member dominates it, removing the members it dominates.
+
+    The front is a list of (complexity, mse, individual) sorted by increasing
+    complexity and strictly decreasing MSE, so both the dominance check and
+    the insertion point are found with a binary search.
+    """
+    if not np.isfinite(mse):
+        return False
+    i = bisect_left(front, complexity, key=lambda member: member[0])
+    if i < len(front) and front[i][0] == complexity and front[i][1] <= mse:
+        return False
+    if i > 0 and front[i - 1][1] <= mse:
+        return False
+    end = i
+    while end < len(front) and front[end][1] >= mse:
+        end += 1
+    front[i:end] = [(complexity, mse, individual)]
+    return True
+
+def crowding_distance(objectives, ranks: np.ndarray) -> np.ndarray:
+    """Crowding distance of every point within its own front, normalized per objective."""
+    values = _as_array(objectives)
+    distances = np.zeros(len(values))
+    if len(values) == 0:
+        return distances
+
+    for column in values.T:
+        # Sort by front first, then by the objective inside each front
+        order = np.lexsort((column, ranks))
+        sorted_values = column[order]
+        sorted_ranks = ranks[order]
+        first = np.r_[True, sorted_ranks[1:] != sorted_ranks[:-1]]
+        last = np.r_[sorted_ranks[1:] != sorted_ranks[:-1], True]
+
+        finite = np.where(np.isfinite(sorted_values), sorted_values, np.nan)
+        with np.errstate(invalid='ignore'):
+            span = np.nanmax(finite) - np.nanmin(finite) if np.isfinite(finite).any() else 0.0
+        gaps = np.zeros(len(values))
+        with np.errstate(invalid='ignore'):
+            gaps[1:-1] = sorted_values[2:] - sorted_values[:-2]
+        gaps[np.isnan(gaps)] = np.inf
+        if span > 0:
+            gaps /= span
+
+        gaps[first | last] = np.inf
+        distances[order] += gaps
+    return distances
 
 def diversity_preserving_selection(front: list[Node], objectives: list[tuple[float, int]], count: int) -> list[Node]:
     """Select individuals preserving diversity using crowding distance."""
-    distances = [0] * len(front)
+    distances = crowding_distance(objectives, np.zeros(len(front), dtype=np.int64))
+    sorted_indices = np.argsort(-distances, kind='stable')
+    return [front[i] for i in sorted_indices[:count]]
 
-    # Calculate crowding distance for each objective
-    for i, obj_values in enumerate(zip(*objectives)):
-        sorted_indices = sorted(range(len(front)), key=lambda x: obj_values[x])
-        distances[sorted_indices[0]] = distances[sorted_indices[-1]] = float('inf')
-        for j in range(1, len(front) - 1):
-            distances[sorted_indices[j]] += obj_values[sorted_indices[j + 1]] - obj_values[sorted_indices[j - 1]]
+def rank_population(objectives: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Return the front rank and crowding distance of every individual of an objectives dict."""
+    values = list(objectives.values())
+    ranks = non_dominated_sort(values)
+    return ranks, crowding_distance(values, ranks)
 
-    # Select individuals with the highest crowding distance
-    sorted_indices = sorted(range(len(front)), key=lambda x: distances[x], reverse=True)
-    return [front[i] for i in sorted_indices[:count]]
+def multi_objective_selection(objectives: dict, return_ranks: bool = False):
+    """Perform multi-objective selection using Pareto fronts and diversity preservation.
 
-def multi_objective_selection(objectives: dict) -> list[Node]:
-    """Perform multi-objective selection using Pareto fronts and diversity preservation."""
-    selected = []
-    remaining_pop = list(objectives.keys())
-    remaining_objectives = list(objectives.values())
-    pop_size = len(remaining_pop)
+    Individuals are ordered by front rank, then by decreasing crowding
+    distance. With return_ranks, the front ranks and crowding distances of
+    the whole population (in the order of objectives) are returned as well,
+    so later stages can reuse them.
+    """
+    population = list(objectives.keys())
+    ranks, distances = rank_population(objectives)
+    order = np.lexsort((-distances, ranks))
+    selected = [population[i] for i in order]
+    if return_ranks:
+        return selected, ranks, distances
+    return selected
 
-    while len(selected) < pop_size:
-        # Find the next Pareto front
-        front = pareto_front(remaining_pop, remaining_objectives)
+def tarpeian(selected: list[Node], objectives: dict, rate: float = 0.3, rng=random) -> list[Node]:
+    """Poli's Tarpeian bloat control: drop each larger-than-average individual with probability rate.
 
-        if len(selected) + len(front) <= pop_size:
-            selected.extend(front)
-        else:
-            # Use diversity-preserving selection if the front size exceeds remaining slots
-            selected.extend(diversity_preserving_selection(front, remaining_objectives, pop_size - len(selected)))
-            break
+    The dropped individuals cannot become parents in this generation. At
+    least two individuals are kept so that crossover still has a pair.
+    """
+    mean_complexity = sum(complexity for _, complexity in objectives.values()) / len(objectives)
+    survivors = [ind for ind in selected if objectives[ind][1] <= mean_complexity or rng.random() >= rate]
+    return survivors if len(survivors) >= 2 else selected
+
+def double_tournament(objectives: dict, count: int, fitness_size: int = 7, parsimony_size: float = 1.4, rng=random) -> list[Node]:
+    """Luke and Panait's double tournament: count winners of size tournaments between fitness tournament winners.
+
+    Each size tournament compares the winners of two fitness tournaments
+    (lowest MSE among fitness_size individuals) and keeps the smaller one
+    with probability parsimony_size / 2, parsimony_size being in [1, 2].
+    """
+    population = list(objectives)
+    fitness_size = min(fitness_size, len(population))
 
-        # Remove Pareto front solutions from the remaining population
-        for individual in front:
-            idx = remaining_pop.index(individual)
-            del remaining_pop[idx]
-            del remaining_objectives[idx]
+    def fitness_winner():
+        return min(rng.sample(population, fitness_size), key=lambda ind: objectives[ind][0])
 
-    return selected
\ No newline at end of file
+    winners = []
+    for _ in range(count):
+        smaller, larger = sorted((fitness_winner(), fitness_winner()), key=lambda ind: objectives[ind][1])
+        winners.append(smaller if rng.random() < parsimony_size / 2 else larger)
+    return winners
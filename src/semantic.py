@@ -0,0 +1,57 @@
+import numpy as np
+
+from .node import Node, structural_key
+from .dag import SubexpressionDAG
+from .racing import squared_error_stats
+
+# Mantissa bits dropped from float32 predictions before hashing
+QUANTIZATION_MASK = np.uint32(0xFFFFFF00)
+
+
+def semantic_signature(predictions: np.ndarray) -> bytes:
+    """Hash of a prediction vector quantized to about four significant digits."""
+    quantized = np.asarray(predictions, dtype=np.float32) + np.float32(0.0)  # Folds -0.0 into 0.0
+    quantized[np.isnan(quantized)] = np.nan
+    return (quantized.view(np.uint32) & QUANTIZATION_MASK).tobytes()
+
+
+class SemanticDeduplicator:
+    """Removes trees that compute the same function on a fixed probe subset of X.
+
+    Trees are evaluated on a small fixed set of rows and grouped by the hash
+    of their quantized predictions; only the smallest tree of each group is
+    kept. The squared-error statistics on the probe rows are remembered by
+    structural hash, so racing can start from them instead of evaluating the
+    same rows again in the next generation. Without racing they are not
+    used: the full evaluation shares subexpressions and cached outputs over
+    all rows, and splitting off the few probe rows would cost more than it
+    saves, so those rows are evaluated twice.
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, probe_size: int = 64, rng: np.random.Generator | None = None):
+        rng = np.random.default_rng() if rng is None else rng
+        self.rows = np.sort(rng.choice(len(X), size=min(probe_size, len(X)), replace=False))
+        self.X_probe = X[self.rows]
+        self.y_probe = y[self.rows]
+        self.stats = {}
+        self.freed = 0
+
+    def deduplicate(self, population: list[Node]) -> tuple[list[Node], int]:
+        """Keep the smallest tree of every semantic class, returning it and the number of freed slots."""
+        dag = SubexpressionDAG(population)
+        results = dag.evaluate(
+            self.X_probe,
+            lambda predictions: (semantic_signature(predictions), squared_error_stats(predictions, self.y_probe)),
+        )
+
+        self.stats = {}
+        best = {}
+        for i, (ind, (signature, stats)) in enumerate(zip(population, results)):
+            self.stats[structural_key(ind)] = stats
+            if signature not in best or ind.size < population[best[signature]].size:
+                best[signature] = i
+
+        kept = sorted(best.values())
+        freed = len(population) - len(kept)
+        self.freed += freed
+        return [population[i] for i in kept], freed
@@ -0,0 +1,80 @@
+import numpy as np
+
+from .node import Node
+from .dag import SubexpressionDAG
+
+
+class ChunkedDataset:
+    """Out-of-core (X, y) data source read one block of rows at a time.
+
+    chunks is a callable returning a fresh iterator of (X, y) blocks, so the
+    data can be streamed again at every evaluation. Individuals are evaluated
+    population_batch at a time on each block, which bounds the memory used by
+    intermediate vectors to about chunk_size * population_batch values.
+    """
+
+    def __init__(self, chunks, n_variables: int, population_batch: int | None = None):
+        self._chunks = chunks
+        self.n_variables = n_variables
+        self.population_batch = population_batch
+
+    @classmethod
+    def from_arrays(cls, X: np.ndarray, y: np.ndarray, chunk_size: int = 65536, population_batch: int | None = None):
+        """Stream arrays (in memory or memory-mapped) with samples along the first axis of X."""
+        def chunks():
+            for start in range(0, len(y), chunk_size):
+                yield X[start:start + chunk_size], y[start:start + chunk_size]
+        return cls(chunks, X.shape[1], population_batch)
+
+    @classmethod
+    def from_npy(cls, x_path: str, y_path: str, chunk_size: int = 65536, transpose: bool = False, population_batch: int | None = None):
+        """Memory-map .npy files; with transpose, X is stored as (n_variables, n_samples) like the problem files."""
+        X = np.load(x_path, mmap_mode='r')
+        y = np.load(y_path, mmap_mode='r')
+        if not transpose:
+            return cls.from_arrays(X, y, chunk_size, population_batch)
+
+        def chunks():
+            for start in range(0, len(y), chunk_size):
+                yield X[:, start:start + chunk_size].T, y[start:start + chunk_size]
+        return cls(chunks, X.shape[0], population_batch)
+
+    @classmethod
+    def from_generator(cls, factory, n_variables: int, population_batch: int | None = None):
+        """Stream the (X, y) blocks yielded by factory(), called once per pass over the data."""
+        return cls(factory, n_variables, population_batch)
+
+    def __iter__(self):
+        for X, y in self._chunks():
+            yield np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+    def head(self) -> tuple[np.ndarray, np.ndarray]:
+        """The first block of rows, in memory."""
+        return next(iter(self))
+
+
+def squared_error_sum(predictions: np.ndarray, y: np.ndarray) -> float:
+    """Sum of the squared errors of clipped predictions, the streaming counterpart of mean_squared_error."""
+    predictions_clipped = np.clip(predictions, -1e10, 1e10)
+    with np.errstate(over='ignore', invalid='ignore'):
+        return float(np.sum((y - predictions_clipped) ** 2))
+
+def streaming_mse(population: list[Node], data: ChunkedDataset) -> tuple[list[float], list[int]]:
+    """MSE and node count of every individual, accumulated block by block.
+
+    Each block is read once and every individual is evaluated on it before
+    moving on to the next one, so the block stays in cache across the
+    population.
+    """
+    batch = data.population_batch or max(1, len(population))
+    dags = [SubexpressionDAG(population[start:start + batch]) for start in range(0, len(population), batch)]
+    sums = np.zeros(len(population))
+    n_samples = 0
+    for X, y in data:
+        start = 0
+        for dag in dags:
+            sums[start:start + len(dag.roots)] += dag.evaluate(X, lambda predictions: squared_error_sum(predictions, y))
+            start += len(dag.roots)
+        n_samples += len(y)
+    sizes = [size for dag in dags for size in dag.sizes]
+    return (sums / max(n_samples, 1)).tolist(), sizes
@@ -1,30 +1,33 @@
+import heapq
 import random
+from collections import OrderedDict
 import numpy as np
-from src.node import OperatorNode, OperandNode, Node
+from .node import OperatorNode, OperandNode, Node, structural_key
+from .compiler import fold_constant
+from .encoding import encode, decode, decode_population
+from .generation import (
+    ramped_half_and_half, CONSTANT_PROBABILITY, OPERATOR_PROBABILITY, OPERATOR_FIRST_PROBABILITY, CONSTANT_RANGE,
+)
 
-# Constants for probabilities and ranges
-CONSTANT_PROBABILITY = 0.3
-OPERATOR_PROBABILITY = 0.6
-OPERATOR_FIRST_PROBABILITY = 0.9
-CONSTANT_RANGE = (-10, 10)
+OPERATOR_SYMBOLS = list(OperatorNode.SYMBOLS)
 
 def generate_random_tree(max_depth, n_variables, current_depth=0, op=None):
     """Generate a random tree with a given maximum depth and number of variables."""
     def get_operator():
         """Generate an operator node with random children."""
-        new_operator = random.choice(list(OperatorNode.OPERATORS.keys()))
+        new_operator = random.choice(OPERATOR_SYMBOLS)
         left = generate_random_tree(max_depth, n_variables, current_depth + 1, new_operator)
         right = None
         if new_operator in OperatorNode.BINARY_OPERATORS:
             right = generate_random_tree(max_depth, n_variables, current_depth + 1, new_operator)
-        return OperatorNode(new_operator, left, right, current_depth)
+        return OperatorNode(new_operator, left, right)
 
     def get_operand():
         """Generate an operand node, either a constant or a variable."""
         if random.random() < CONSTANT_PROBABILITY:
             value = round(random.uniform(*CONSTANT_RANGE), 2)
-            return OperandNode(value, current_depth)
-        return OperandNode(f'x_{random.randint(0, n_variables-1)}', current_depth)
+            return OperandNode(value)
+        return OperandNode(f'x_{random.randint(0, n_variables-1)}')
 
     if current_depth >= max_depth:
         return get_operand()
@@ -34,101 +37,202 @@ def generate_random_tree(max_depth, n_variables, current_depth=0, op=None):
         return get_operator()
     return get_operand()
 
-def initialize_population(pop_size, n_variables, max_depth=5):
-    """Initialize a population of random trees."""
-    return np.array([generate_random_tree(max_depth, n_variables) for _ in range(pop_size)])
+def initialize_population(pop_size, n_variables, max_depth=5, rng=None):
+    """Initialize a population of random ramped half-and-half trees, drawn from a numpy Generator."""
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+    return decode_population(ramped_half_and_half(pop_size, n_variables, max_depth, rng))
 
-def find_parent(root: Node, target: Node, parent: Node = None) -> Node | None:
+def find_parent(root: Node, target: Node) -> Node | None:
     """Find the parent of a given node in the tree."""
     if root is target:
-        return parent
-    if isinstance(root, OperatorNode):
-        if root.left:
-            found = find_parent(root.left, target, root)
-            if found:
-                return found
-        if root.right:
-            found = find_parent(root.right, target, root)
-            if found:
-                return found
-    return None
+        return None
+    return target.parent
 
 def replace_child(root: Node, old_child: Node, new_child: Node) -> None:
     """Replace a child node with a new node in the tree."""
-    if not isinstance(root, OperatorNode):
+    parent = find_parent(root, old_child)
+    if parent is None:
         return
-    if root.left is old_child:
-        root.left = new_child
-        return
-    if root.right is old_child:
-        root.right = new_child
-        return
-    if root.left:
-        replace_child(root.left, old_child, new_child)
-    if root.right:
-        replace_child(root.right, old_child, new_child)
+    if parent.left is old_child:
+        parent.left = new_child
+    elif parent.right is old_child:
+        parent.right = new_child
+
+# Memoized simplifications, keyed by the structural hash of the input tree and
+# stored as compact encoded trees. None marks trees already in canonical form.
+SIMPLIFY_MEMO_SIZE = 50_000
+_simplify_memo = OrderedDict()
 
 def simplify_expression(node: Node) -> Node:
-    """Simplify an expression tree by reducing constant expressions."""
+    """Rewrite an expression tree into a canonical, simplified form.
+
+    Constant subtrees are folded, identities such as x - x, x / x and x + x
+    are rewritten, associative chains of + and * are flattened with their
+    constants folded into one and their other operands sorted. Results are
+    memoized by structural hash, so equivalent trees come out identical and
+    repeated offspring are simplified only once.
+    """
+    key = structural_key(node)
+    if key in _simplify_memo:
+        _simplify_memo.move_to_end(key)
+        cached = _simplify_memo[key]
+        return node if cached is None else decode(cached)
+
+    simplified = _simplify(node)
+    if simplified is not node:
+        # A promoted subtree is detached from the operator it replaces
+        simplified.parent = None
+    canonical = structural_key(simplified) == key
+    _simplify_memo[key] = None if canonical else encode(simplified)
+    if len(_simplify_memo) > SIMPLIFY_MEMO_SIZE:
+        _simplify_memo.popitem(last=False)
+    return simplified
+
+def _is_constant(node: Node) -> bool:
+    return isinstance(node, OperandNode) and node.index < 0
+
+def _same(node1: Node, node2: Node) -> bool:
+    return structural_key(node1) == structural_key(node2)
+
+def _simplify(node: Node) -> Node:
+    """Simplify the children of a node, then the node itself."""
     if isinstance(node, OperandNode):
         return node
-    if isinstance(node, OperatorNode):
-        node.left = simplify_expression(node.left)
-        if node.right:
-            node.right = simplify_expression(node.right)
-        if node.operator_symbol in OperatorNode.BINARY_OPERATORS:
-            return simplify_binary_operator(node)
-        return simplify_unary_operator(node)
-    return node
+    node.left = _simplify(node.left)
+    if node.right is not None:
+        node.right = _simplify(node.right)
+    if node.opcode in OperatorNode.BINARY_OPCODES:
+        return simplify_binary_operator(node)
+    return simplify_unary_operator(node)
 
 def simplify_binary_operator(node: OperatorNode) -> Node:
-    """Simplify binary operator nodes."""
-    if isinstance(node.left, OperandNode) and isinstance(node.right, OperandNode):
-        if isinstance(node.left.value, float) and isinstance(node.right.value, float):
-            return OperandNode(node.function(node.left.value, node.right.value))
-    if node.operator_symbol == '+':
-        if isinstance(node.left, OperandNode) and node.left.value == 0:
-            return node.right
-        if isinstance(node.right, OperandNode) and node.right.value == 0:
-            return node.left
-    elif node.operator_symbol == '*':
-        if isinstance(node.left, OperandNode) and node.left.value == 1:
-            return node.right
-        if isinstance(node.right, OperandNode) and node.right.value == 1:
-            return node.left
-        if isinstance(node.left, OperandNode) and node.left.value == 0:
-            return OperandNode(0)
-        if isinstance(node.right, OperandNode) and node.right.value == 0:
-            return OperandNode(0)
-    elif node.operator_symbol == '-':
-        if isinstance(node.right, OperandNode) and node.right.value == 0:
-            return node.left
-        if isinstance(node.left, OperandNode) and isinstance(node.right, OperandNode) and node.left.value == node.right.value:
-            return OperandNode(0)
-    elif node.operator_symbol == '/':
-        if isinstance(node.right, OperandNode) and node.right.value == 1:
-            return node.left
-        if isinstance(node.left, OperandNode) and isinstance(node.right, OperandNode) and node.left.value == node.right.value:
-            return OperandNode(1)
-    elif node.operator_symbol == '**':
-        if isinstance(node.right, OperandNode) and node.right.value == 1:
-            return node.left
-        if isinstance(node.right, OperandNode) and node.right.value == 0:
-            return OperandNode(1)
+    """Simplify binary operator nodes whose children are already simplified."""
+    left, right = node.left, node.right
+    if _is_constant(left) and _is_constant(right):
+        return OperandNode(fold_constant(node))
+
+    symbol = node.operator_symbol
+    if symbol == '-':
+        if _is_constant(right) and right.value == 0:
+            return left
+        if _same(left, right):
+            return OperandNode(0.0)
+        if _is_constant(right):
+            # x - c becomes x + (-c), so it joins the enclosing + chain
+            return canonical_chain(OperatorNode('+', left, OperandNode(-float(right.value))))
+    elif symbol == '/':
+        if _is_constant(right) and right.value == 1:
+            return left
+        if _same(left, right):
+            # Protected division also yields 1 when x == 0
+            return OperandNode(1.0)
+        if _is_constant(right):
+            if right.value == 0:
+                return OperandNode(1.0)
+            # x / c becomes x * (1 / c), so it joins the enclosing * chain
+            return canonical_chain(OperatorNode('*', left, OperandNode(1.0 / float(right.value))))
+    else:
+        return canonical_chain(node)
     return node
 
 def simplify_unary_operator(node: OperatorNode) -> Node:
-    """Simplify unary operator nodes."""
-    if isinstance(node.left, OperandNode) and isinstance(node.left.value, float):
-        return OperandNode(node.function(node.left.value))
+    """Simplify unary operator nodes whose child is already simplified."""
+    if _is_constant(node.left):
+        return OperandNode(fold_constant(node))
+    if node.operator_symbol == 'abs' and isinstance(node.left, OperatorNode) and node.left.operator_symbol == 'abs':
+        return node.left
     return node
 
+def _chain_terms(node: Node, opcode: int, terms: list) -> list:
+    """Collect the operands of a chain of the same associative operator, left to right."""
+    if isinstance(node, OperatorNode) and node.opcode == opcode:
+        _chain_terms(node.left, opcode, terms)
+        _chain_terms(node.right, opcode, terms)
+    else:
+        terms.append(node)
+    return terms
+
+def _chain_plan(terms: list[Node]) -> Node | tuple:
+    """Plan the shallowest chain over the terms, as nested (left, right) pairs.
+
+    The two shallowest subchains are joined first, ties going to the earlier
+    term, so the same sorted terms always give the same shape, and the chain
+    is never taller than any other arrangement of its terms.
+    """
+    heap = [(term.height, order, term) for order, term in enumerate(terms)]
+    heapq.heapify(heap)
+    order = len(terms)
+    while len(heap) > 1:
+        left_height, _, left = heapq.heappop(heap)
+        right_height, _, right = heapq.heappop(heap)
+        heapq.heappush(heap, (max(left_height, right_height) + 1, order, (left, right)))
+        order += 1
+    return heap[0][2]
+
+def _matches_plan(node: Node, plan: Node | tuple, opcode: int) -> bool:
+    """Check that a chain already has the planned shape and terms."""
+    if not isinstance(plan, tuple):
+        return node is plan
+    return (isinstance(node, OperatorNode) and node.opcode == opcode
+            and _matches_plan(node.left, plan[0], opcode) and _matches_plan(node.right, plan[1], opcode))
+
+def _build_plan(symbol: str, plan: Node | tuple) -> Node:
+    if not isinstance(plan, tuple):
+        return plan
+    return OperatorNode(symbol, _build_plan(symbol, plan[0]), _build_plan(symbol, plan[1]))
+
+def canonical_chain(node: OperatorNode) -> Node:
+    """Canonical form of a + or * chain: sorted operands, then a single folded constant.
+
+    For + chains, repeated operands are merged (x + x becomes x * 2). The
+    operands are rejoined into the shallowest chain rather than a left
+    spine, so simplifying never makes a tree taller than the depth limit
+    it was bred under. The original node is returned untouched when it is
+    already canonical.
+    """
+    adding = node.operator_symbol == '+'
+    terms = _chain_terms(node, node.opcode, [])
+
+    constant = 0.0 if adding else 1.0
+    operands = []
+    for term in terms:
+        if _is_constant(term):
+            constant = constant + float(term.value) if adding else constant * float(term.value)
+        else:
+            operands.append((structural_key(term), term))
+    if not adding and constant == 0:
+        return OperandNode(0.0)
+    operands.sort(key=lambda keyed: keyed[0])
+
+    canonical = []
+    i = 0
+    while i < len(operands):
+        j = i
+        while j < len(operands) and operands[j][0] == operands[i][0]:
+            j += 1
+        term = operands[i][1]
+        if adding and j - i > 1:
+            canonical.append(canonical_chain(OperatorNode('*', term, OperandNode(float(j - i)))))
+        else:
+            canonical.extend(keyed[1] for keyed in operands[i:j])
+        i = j
+    canonical.sort(key=structural_key)
+    if constant != (0.0 if adding else 1.0) or not canonical:
+        canonical.append(OperandNode(constant))
+
+    plan = _chain_plan(canonical)
+    # Keep the existing tree (and its cached outputs) if it is already the canonical chain
+    if _matches_plan(node, plan, node.opcode):
+        return node
+    return _build_plan(node.operator_symbol, plan)
+
 def trim_population(population: list[Node]) -> list[Node]:
     """Trim the population to remove duplicate individuals."""
     unique_individuals = []
     seen_hashes = set()
     for ind in population:
-        ind_hash = hash(str(ind))
+        ind_hash = structural_key(ind)
         if ind_hash not in seen_hashes:
             seen_hashes.add(ind_hash)
             unique_individuals.append(ind)
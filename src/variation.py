@@ -0,0 +1,152 @@
+import multiprocessing
+import os
+import pickle
+import random
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from .node import Node
+from .crossover import crossover
+from .mutations import mutate
+from .encoding import encode_population, decode_population
+from .utils import simplify_expression
+
+
+def offspring_batch(
+        parents: list[Node],
+        count: int,
+        seed: int,
+        gen: int,
+        batch: int,
+        crossover_rate: float,
+        mutation_rate: float,
+        max_depth: int,
+        n_variables: int,
+        max_size: int | None = None,
+) -> list[Node]:
+    """Produce count simplified offspring from parents with the random state of one batch.
+
+    The random module is seeded from (seed, gen, batch) only, so a batch gives
+    the same offspring whichever process runs it. Crossover keeps the
+    offspring within max_depth and max_size.
+    """
+    random.seed(f'{seed}-{gen}-{batch}')
+    offspring = []
+    while len(offspring) < count:
+        if random.random() < crossover_rate:
+            parent1, parent2 = random.sample(parents, 2)
+            offspring1, offspring2 = crossover(parent1, parent2, max_size, max_depth + 1)
+            offspring.append(simplify_expression(offspring1))
+            offspring.append(simplify_expression(offspring2))
+        else:
+            individual = random.choice(parents)
+            mutated = mutate(individual, max_depth, mutation_rate, n_variables)
+            offspring.append(simplify_expression(mutated))
+    return offspring[:count]
+
+# Parents of the current generation in a worker: (shared memory name, decoded parents)
+_worker_parents = (None, None)
+
+def _load_parents(name: str, size: int) -> list[Node]:
+    """Decode the parents published in shared memory, once per worker and generation."""
+    global _worker_parents
+    if _worker_parents[0] != name:
+        memory = SharedMemory(name=name)
+        try:
+            packed = pickle.loads(bytes(memory.buf[:size]))
+        finally:
+            memory.close()
+        _worker_parents = (name, decode_population(packed))
+    return _worker_parents[1]
+
+def _encoded_batch(args) -> tuple:
+    """Worker entry point: offspring_batch on the published parents, returning encoded offspring."""
+    name, size, *options = args
+    return encode_population(offspring_batch(_load_parents(name, size), *options))
+
+
+class OffspringPool:
+    """Process pool producing offspring in independent, seeded batches.
+
+    Offspring are split into batches of batch_size, each generated from its
+    own (seed, gen, batch) random state, so the result for a given seed does
+    not depend on the number of workers. The parents are encoded once per
+    generation into shared memory, and each worker decodes them once for
+    all the batches it runs; batches come back in order as encoded trees.
+    Without worker processes, the batches are produced from the parents
+    directly. With on_batch, the caller can evaluate a finished batch while
+    the workers are still producing the next ones.
+    """
+
+    def __init__(self, n_jobs: int = -1, batch_size: int = 64):
+        self.n_workers = os.cpu_count() if n_jobs is None or n_jobs < 0 else n_jobs
+        self.batch_size = batch_size
+        self._pool = None
+        if self.n_workers > 1:
+            # Workers attaching to the parents' shared memory must report to
+            # the tracker of this process, which unlinks it, not start their own
+            resource_tracker.ensure_running()
+            self._pool = multiprocessing.Pool(self.n_workers)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def generate(
+            self,
+            parents: list[Node],
+            n_offspring: int,
+            seed: int,
+            gen: int,
+            crossover_rate: float,
+            mutation_rate: float,
+            max_depth: int,
+            n_variables: int,
+            max_size: int | None = None,
+            on_batch=None,
+    ) -> list[Node]:
+        """Generate n_offspring offspring from parents, calling on_batch on every batch as it arrives."""
+        counts = [min(self.batch_size, n_offspring - start) for start in range(0, n_offspring, self.batch_size)]
+        options = [(count, seed, gen, batch, crossover_rate, mutation_rate, max_depth, n_variables, max_size)
+                   for batch, count in enumerate(counts)]
+
+        offspring = []
+        if self._pool is None:
+            for batch_options in options:
+                batch = self._serial_batch(parents, batch_options)
+                if on_batch is not None:
+                    on_batch(batch)
+                offspring.extend(batch)
+            return offspring
+
+        payload = pickle.dumps(encode_population(parents), protocol=pickle.HIGHEST_PROTOCOL)
+        memory = SharedMemory(create=True, size=len(payload))
+        try:
+            memory.buf[:len(payload)] = payload
+            tasks = [(memory.name, len(payload)) + batch_options for batch_options in options]
+            for packed in self._pool.imap(_encoded_batch, tasks):
+                batch = decode_population(packed)
+                if on_batch is not None:
+                    on_batch(batch)
+                offspring.extend(batch)
+        finally:
+            memory.close()
+            memory.unlink()
+        return offspring
+
+    @staticmethod
+    def _serial_batch(parents: list[Node], options: tuple) -> list[Node]:
+        """Run a batch in this process without disturbing the caller's random state."""
+        state = random.getstate()
+        try:
+            return offspring_batch(parents, *options)
+        finally:
+            random.setstate(state)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src.archive import ParetoArchive
+from src.islands import island_model, migration_targets
+
+
+def test_random_topology_is_a_cycle():
+    for gen in range(5):
+        targets = migration_targets(5, gen, 'random', seed=1)
+        assert sorted(targets) == list(range(5))
+        assert all(target != island for island, target in enumerate(targets))
+
+@pytest.mark.parametrize('option', [
+    {'checkpoint_file': 'run.pkl'},
+    {'archive': ParetoArchive()},
+    {'instrumentation': object()},
+])
+def test_options_shared_by_every_island_are_rejected(option):
+    X = np.zeros((10, 1))
+    y = np.zeros(10)
+    with pytest.raises(ValueError, match=next(iter(option))):
+        island_model(X, y, n_islands=2, pop_size=10, generations=1, **option)
+
+def test_islands_return_the_best_of_all_islands():
+    X = np.random.default_rng(0).uniform(-3, 3, size=(500, 2))
+    y = X[:, 0] * X[:, 1]
+    best, fitness, histories = island_model(
+        X, y, n_islands=2, migration_interval=2, seed=1,
+        pop_size=50, generations=4, max_depth=4, crossover_rate=0.4, mutation_rate=0.8, verbose=False,
+    )
+    assert len(histories) == 2
+    assert fitness == min(history[-1] for history in histories)
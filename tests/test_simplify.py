@@ -0,0 +1,33 @@
+import random
+
+import numpy as np
+
+from src.node import OperatorNode, OperandNode, Node
+from src.utils import initialize_population, simplify_expression
+from src.variation import offspring_batch
+
+
+def balanced_sum(terms: list[Node]) -> Node:
+    if len(terms) == 1:
+        return terms[0]
+    middle = len(terms) // 2
+    return OperatorNode('+', balanced_sum(terms[:middle]), balanced_sum(terms[middle:]))
+
+def test_chain_is_not_rebuilt_as_a_spine():
+    tree = balanced_sum([OperandNode(f'x_{i}') for i in range(8)])
+    assert tree.height == 4
+    assert simplify_expression(tree).height == 4
+
+def test_chain_keeps_deep_terms_shallow():
+    deep = OperatorNode('sin', OperatorNode('sin', OperatorNode('sin', OperandNode('x_0'))))
+    tree = OperatorNode('+', OperatorNode('+', OperandNode('x_1'), OperandNode('x_2')), OperatorNode('+', deep, OperandNode('x_3')))
+    height = tree.height
+    assert simplify_expression(tree).height <= height
+
+def test_simplified_offspring_stay_within_depth_limit():
+    max_depth = 5
+    random.seed(0)
+    parents = initialize_population(200, 3, max_depth, np.random.default_rng(0))
+    for gen in range(10):
+        parents = offspring_batch(parents, 200, 0, gen, 0, 0.5, 0.8, max_depth, 3)
+        assert max(individual.height for individual in parents) <= max_depth + 1